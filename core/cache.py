@@ -0,0 +1,295 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# ограничение SQLite на число параметров запроса
+MAX_PARAMS = 900
+# столько записей между проверками размера кэша
+CULL_CHECK_EVERY = 64
+# накопленные чтения сбрасываются в accessed не реже этого
+TOUCH_BATCH = 1000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+'''
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов и потоков сервера.
+
+    LOCATION — путь к файлу. Целые числа хранятся как INTEGER, поэтому
+    incr — это UPDATE value = value + delta под BEGIN IMMEDIATE, атомарный
+    между процессами; остальное хранится в pickle. Журнал WAL: чтения не ждут
+    записи.
+
+    Вытеснение LRU по времени последнего чтения. Чтобы чтения не брали
+    блокировку записи, время доступа копится в процессе и записывается
+    вместе с ближайшей записью. MAX_ENTRIES и MAX_SIZE (байт, в OPTIONS)
+    проверяются раз в CULL_CHECK_EVERY записей, так что границы мягкие.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._max_size = int(options.get('MAX_SIZE', 0))
+        self._local = threading.local()
+        self._writes = 0
+        self._touched = {}
+
+    # соединение
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        # после fork соединение родителя использовать нельзя
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _write(self, func):
+        """Выполняет func(connection) в транзакции BEGIN IMMEDIATE вместе с
+        накопленными отметками чтения и, если пора, вытеснением."""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(connection)
+            self._flush_touched(connection)
+            self._writes += 1
+            if self._writes % CULL_CHECK_EVERY == 0:
+                self._cull(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    # сериализация
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    # LRU и вытеснение
+
+    def _flush_touched(self, connection):
+        if self._touched:
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched = {}
+
+    def _cull(self, connection):
+        now = time.time()
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (now,),
+        )
+        count, size = connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache'
+        ).fetchone()
+        excess = 0
+        if count > self._max_entries:
+            # как в бэкендах Django: удаляется 1/CULL_FREQUENCY записей
+            excess = max(
+                count - self._max_entries,
+                count // self._cull_frequency if self._cull_frequency else 0,
+            )
+        if self._max_size and size > self._max_size:
+            average = size / count
+            excess = max(
+                excess, int((size - self._max_size * 0.9) / average) + 1
+            )
+        if excess:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (excess,),
+            )
+
+    # API кэша
+
+    def _select(self, made):
+        """{ключ: значение} для живых записей из made {ключ кэша: ключ}."""
+        connection = self._connection()
+        now = time.time()
+        result = {}
+        names = list(made)
+        for start in range(0, len(names), MAX_PARAMS):
+            chunk = names[start:start + MAX_PARAMS]
+            rows = connection.execute(
+                'SELECT key, value FROM cache WHERE key IN ({}) '
+                'AND (expires IS NULL OR expires > ?)'.format(
+                    ', '.join('?' * len(chunk))
+                ),
+                (*chunk, now),
+            ).fetchall()
+            for made_key, value in rows:
+                result[made[made_key]] = self._decode(value)
+                self._touched[made_key] = now
+        if len(self._touched) >= TOUCH_BATCH:
+            self._write(lambda connection: None)
+        return result
+
+    def get_many(self, keys, version=None):
+        made = {}
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            made[made_key] = key
+        return self._select(made) if made else {}
+
+    def get(self, key, default=None, version=None):
+        # не через get_many: core.timing считает попадания в обоих методах
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        return self._select({made_key: key}).get(key, default)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self._expires(timeout)
+        rows = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            rows.append((key, self._encode(value), expires, now))
+
+        def write(connection):
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed)'
+                ' VALUES (?, ?, ?, ?)',
+                rows,
+            )
+        if rows:
+            self._write(write)
+        return []
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        row = (key, self._encode(value), self._expires(timeout), now)
+
+        def write(connection):
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now),
+            )
+            return connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, accessed)'
+                ' VALUES (?, ?, ?, ?)',
+                row,
+            ).rowcount == 1
+        return self._write(write)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+
+        def write(connection):
+            connection.execute(
+                'UPDATE cache SET value = value + ?, accessed = ? '
+                "WHERE key = ? AND typeof(value) = 'integer' "
+                'AND (expires IS NULL OR expires > ?)',
+                (delta, now, key, now),
+            )
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            if isinstance(row[0], int):
+                return row[0]
+            # не целое (например, float) — через pickle под той же блокировкой
+            value = self._decode(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                (self._encode(value), now, key),
+            )
+            return value
+        return self._write(write)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        expires = self._expires(timeout)
+        return self._write(lambda connection: connection.execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (expires, now, key, now),
+        ).rowcount == 1)
+
+    def delete_many(self, keys, version=None):
+        names = []
+        for key in keys:
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            names.append(key)
+
+        def write(connection):
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?', [(key,) for key in names]
+            )
+        if names:
+            self._write(write)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def clear(self):
+        self._touched = {}
+        self._write(lambda connection: connection.execute(
+            'DELETE FROM cache'
+        ))
+
+    def close(self, **kwargs):
+        # соединение живет весь поток, как у LocMemCache память
+        pass
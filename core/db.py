@@ -0,0 +1,50 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Выполняет PRAGMA из ключа PRAGMAS настроек БД на каждом новом
+    соединении SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in connection.settings_dict.get(
+            'PRAGMAS', {}
+        ).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+def atomic_with_retries(func, *args, using=None, **kwargs):
+    """Выполняет func в транзакции и повторяет ее, если SQLite ответил
+    «database is locked».
+
+    busy timeout не помогает, когда блокировку не удается получить внутри
+    уже начатой транзакции: SQLite сразу возвращает ошибку, и транзакцию
+    нужно начать заново.
+    """
+    for attempt in range(settings.DB_WRITE_RETRIES + 1):
+        try:
+            with transaction.atomic(using=using):
+                return func(*args, **kwargs)
+        except OperationalError as error:
+            if not is_locked(error) or attempt == settings.DB_WRITE_RETRIES:
+                raise
+        time.sleep(settings.DB_WRITE_RETRY_DELAY * 2 ** attempt)
+
+
+def retry_on_locked(view):
+    """Декоратор пишущих view, см. atomic_with_retries."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return atomic_with_retries(view, request, *args, **kwargs)
+    return wrapper
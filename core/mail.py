@@ -0,0 +1,87 @@
+import copy
+import logging
+import pickle
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import SpooledEmail
+
+logger = logging.getLogger(__name__)
+
+
+class SpoolEmailBackend(BaseEmailBackend):
+    """Вместо отправки сохраняет письма в таблицу SpooledEmail одним
+    INSERT; доставляет их команда send_spooled_email через
+    EMAIL_SPOOL_BACKEND, так что запрос не ждет почтовый сервер."""
+
+    def send_messages(self, email_messages):
+        spooled = []
+        for message in email_messages:
+            message = copy.copy(message)
+            # соединение не сериализуется, воркер подставит свое
+            message.connection = None
+            spooled.append(SpooledEmail(message=pickle.dumps(message)))
+        SpooledEmail.objects.bulk_create(spooled)
+        return len(spooled)
+
+
+def _claim(batch_size):
+    """Забирает пачку писем, которым пора уходить: на время аренды
+    EMAIL_SPOOL_LEASE_SEC их не возьмет другой воркер."""
+    now = timezone.now()
+    due = SpooledEmail.objects.filter(failed=False, next_attempt__lte=now)
+    ids = list(due.values_list('id', flat=True)[:batch_size])
+    lease = now + timedelta(seconds=settings.EMAIL_SPOOL_LEASE_SEC)
+    # воркер, успевший обновить строку раньше, уже сдвинул next_attempt
+    due.filter(id__in=ids).update(next_attempt=lease)
+    return list(SpooledEmail.objects.filter(id__in=ids, next_attempt=lease))
+
+
+def _failed(email, error):
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'
+    email.failed = email.attempts >= settings.EMAIL_SPOOL_MAX_ATTEMPTS
+    email.next_attempt = timezone.now() + timedelta(
+        seconds=settings.EMAIL_SPOOL_RETRY_DELAY * 2 ** (email.attempts - 1)
+    )
+    email.save(update_fields=(
+        'attempts', 'last_error', 'failed', 'next_attempt'
+    ))
+    logger.warning('Письмо %s не отправлено: %s', email.pk, email.last_error)
+
+
+def deliver(batch_size=None):
+    """Отправляет одну пачку писем через одно соединение
+    EMAIL_SPOOL_BACKEND. Неудачные откладываются с экспоненциальной
+    задержкой, после EMAIL_SPOOL_MAX_ATTEMPTS попыток помечаются failed.
+    Возвращает (отправлено, не отправлено)."""
+    emails = _claim(batch_size or settings.EMAIL_SPOOL_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+    sent, failed = [], 0
+    connection = get_connection(settings.EMAIL_SPOOL_BACKEND)
+    try:
+        connection.open()
+        for email in emails:
+            try:
+                message = pickle.loads(email.message)
+                message.connection = connection
+                connection.send_messages([message])
+            except Exception as error:
+                _failed(email, error)
+                failed += 1
+            else:
+                sent.append(email.pk)
+    except Exception as error:
+        # соединение не открылось: вся пачка уходит на повтор
+        for email in emails[len(sent) + failed:]:
+            _failed(email, error)
+            failed += 1
+    finally:
+        SpooledEmail.objects.filter(id__in=sent).delete()
+        connection.close()
+    return len(sent), failed
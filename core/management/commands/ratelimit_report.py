@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core import ratelimit
+
+
+class Command(BaseCommand):
+    help = 'Выводит число пропущенных и отклоненных ограничителем запросов'
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"view":<20}{"scope":<8}{"allowed":>10}{"denied":>10}'
+        )
+        for name, scopes in ratelimit.stats().items():
+            for scope, counts in scopes.items():
+                self.stdout.write(
+                    f'{name:<20}{scope:<8}'
+                    f'{counts["allowed"]:>10}{counts["denied"]:>10}'
+                )
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import mail
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди SpooledEmail пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.EMAIL_SPOOL_BATCH_SIZE,
+            help='Писем за одно соединение с почтовым сервером',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а проверять очередь каждые --interval с',
+        )
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = mail.deliver(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено: {sent}, отложено: {failed}'
+                )
+            if sent + failed >= options['batch_size']:
+                # очередь не разобрана, следующая пачка сразу
+                continue
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
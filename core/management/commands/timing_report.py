@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import timing
+
+
+class Command(BaseCommand):
+    help = 'Выводит гистограммы Server-Timing, собранные по URL name'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json', dest='json_path',
+            help='Файл для машиночитаемого отчета',
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить собранные гистограммы после вывода',
+        )
+
+    def handle(self, *args, **options):
+        report = timing.report()
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump(report, output, indent=2)
+        self.stdout.write(
+            f'{"url name":<28}{"samples":>8}{"p50 ms":>8}{"p95 ms":>8}'
+            f'{"p99 ms":>8}{"sql ms":>8}{"queries":>8}{"tpl ms":>8}'
+            f'{"hits":>6}{"misses":>7}'
+        )
+        for name, row in report.items():
+            self.stdout.write(
+                f'{name:<28}{row["requests"]:>8}'
+                f'{str(row["total"]["p50_ms"]):>8}'
+                f'{str(row["total"]["p95_ms"]):>8}'
+                f'{str(row["total"]["p99_ms"]):>8}'
+                f'{row["sql"]["mean_ms"]:>8}'
+                f'{row["sql_queries_per_request"]:>8}'
+                f'{row["template"]["mean_ms"]:>8}'
+                f'{row["cache_hits_per_request"]:>6}'
+                f'{row["cache_misses_per_request"]:>7}'
+            )
+        if options['reset']:
+            timing.reset()
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-17 19:17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpooledEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.BinaryField(verbose_name='Сериализованное письмо')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата постановки в очередь')),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Следующая попытка')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Число попыток')),
+                ('failed', models.BooleanField(default=False, verbose_name='Попытки исчерпаны')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Письмо в очереди',
+                'verbose_name_plural': 'Письма в очереди',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='spooledemail',
+            index=models.Index(fields=['failed', 'next_attempt'], name='spooled_email_due_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import models
+from django.utils import timezone
+
+
+class SpooledEmail(models.Model):
+    """Письмо в очереди на отправку, см. core.mail."""
+
+    message = models.BinaryField(verbose_name='Сериализованное письмо')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки в очередь',
+    )
+    next_attempt = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Следующая попытка',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Число попыток',
+    )
+    failed = models.BooleanField(
+        default=False,
+        verbose_name='Попытки исчерпаны',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка',
+    )
+
+    class Meta:
+        ordering = ('id',)
+        indexes = (
+            models.Index(
+                fields=('failed', 'next_attempt'),
+                name='spooled_email_due_idx',
+            ),
+        )
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Письма в очереди'
+
+    def __str__(self):
+        return f'{self.pk}: попыток {self.attempts}'
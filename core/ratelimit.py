@@ -0,0 +1,138 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+KEY = 'ratelimit:{}:{}:{}'
+STATS_KEY = 'ratelimit_stats:{}:{}:{}'
+OUTCOMES = ('allowed', 'denied')
+
+
+def parse_rate(rate):
+    """'10/m' -> (емкость 10, пополнение токенов в секунду)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+def _cache():
+    return caches[settings.RATELIMIT_CACHE]
+
+
+def take(name, scope, ident, rate):
+    """Берет токен из ведра (name, scope, ident). Возвращает 0, если
+    токен есть, иначе через сколько секунд он появится.
+
+    Вместо пары «токены, время» в кэше хранится один счетчик выданных
+    токенов n, который меняется только атомарным incr. К моменту now
+    заработано earned = now * refill токенов; запрос проходит, если
+    n <= earned. Счетчик не опускается ниже earned - capacity, так
+    что после простоя в ведре не больше capacity токенов.
+    """
+    capacity, refill = parse_rate(rate)
+    cache = _cache()
+    key = KEY.format(name, scope, ident)
+    earned = int(time.time() * refill)
+    period = math.ceil(capacity / refill)
+    # за это время простоя ведро наполняется, и ключ можно забыть
+    timeout = max(period * 2, 60)
+    floor = earned - capacity + 1
+    # новое ведро сразу полное: подтягивать счетчик не нужно
+    cache.add(key, earned - capacity, timeout)
+    try:
+        used = cache.incr(key)
+    except ValueError:
+        # ключ вытеснили между add и incr
+        cache.set(key, floor, timeout)
+        return 0
+    # после простоя счетчик отстал от earned - capacity. Подтягивает его
+    # один запрос в секунду: шаг считается от своего used, и шаги
+    # параллельных запросов сложились бы
+    if used < floor and cache.add(f'{key}:lift', 1, 1):
+        used = cache.incr(key, floor - used)
+    if used <= earned:
+        cache.touch(key, timeout)
+        return 0
+    cache.decr(key)
+    return min(math.ceil((used - earned) / refill), period)
+
+
+def refund(name, scope, ident):
+    try:
+        _cache().decr(KEY.format(name, scope, ident))
+    except ValueError:
+        pass
+
+
+def _count(name, scope, outcome):
+    cache = _cache()
+    key = STATS_KEY.format(name, scope, outcome)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def stats():
+    """Счетчики пропущенных и отклоненных запросов по view и scope."""
+    keys = {
+        (name, scope, outcome): STATS_KEY.format(name, scope, outcome)
+        for name, limits in settings.RATE_LIMITS.items()
+        for scope in limits
+        for outcome in OUTCOMES
+    }
+    values = _cache().get_many(keys.values())
+    result = {}
+    for (name, scope, outcome), key in keys.items():
+        result.setdefault(name, {}).setdefault(scope, {})[outcome] = (
+            values.get(key, 0)
+        )
+    return result
+
+
+def identities(request):
+    """Ключи ведер запроса: пользователь (если вошел) и IP-адрес."""
+    if request.user.is_authenticated:
+        yield 'user', request.user.pk
+    yield 'ip', request.META.get('REMOTE_ADDR', '')
+
+
+def too_many_requests(request, retry_after):
+    response = render(request, 'core/429.html', status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(name, methods=('POST',)):
+    """Ограничивает частоту запросов к view по RATE_LIMITS[name]:
+    {'user': '10/m', 'ip': '30/m'}. Запросы с методами не из methods
+    (None — любые) не ограничиваются. Сверх лимита — 429 с Retry-After.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limits = settings.RATE_LIMITS.get(name, {})
+            if methods is not None and request.method not in methods:
+                return view(request, *args, **kwargs)
+            taken = []
+            for scope, ident in identities(request):
+                if scope not in limits:
+                    continue
+                retry_after = take(name, scope, ident, limits[scope])
+                if retry_after:
+                    _count(name, scope, 'denied')
+                    # токены других ведер запрос не израсходовал
+                    for taken_scope, taken_ident in taken:
+                        refund(name, taken_scope, taken_ident)
+                    return too_many_requests(request, retry_after)
+                taken.append((scope, ident))
+            for scope, _ in taken:
+                _count(name, scope, 'allowed')
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,74 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+LOCK_KEY = '{}:lock'
+# пауза между проверками, не пересчитал ли значение владелец блокировки
+POLL_SEC = 0.05
+
+
+def _should_refresh(expires, delta):
+    """Вероятностное раннее обновление (XFetch): чем ближе срок и чем
+    дольше пересчет, тем вероятнее запрос обновит значение заранее."""
+    if expires is None:
+        return False
+    jitter = -delta * settings.STAMPEDE_BETA * math.log(1 - random.random())
+    return time.time() + jitter >= expires
+
+
+def _wait(cache, key):
+    deadline = time.monotonic() + settings.STAMPEDE_WAIT_SEC
+    while time.monotonic() < deadline:
+        time.sleep(POLL_SEC)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_set(key, compute, timeout=DEFAULT_TIMEOUT, cache=None):
+    """cache.get_or_set без лавины пересчетов.
+
+    Значение хранится вместе со сроком свежести и временем пересчета и
+    живет в кэше еще STAMPEDE_STALE_SEC после срока. Пересчитывает только
+    запрос, взявший блокировку: остальные отдают устаревшее значение,
+    а если его нет — ждут до STAMPEDE_WAIT_SEC и считают сами.
+    """
+    cache = cache or default_cache
+    timeout = cache.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+    if timeout is not None and timeout <= 0:
+        return compute()
+    lock_key = LOCK_KEY.format(key)
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires, delta = entry
+        if not _should_refresh(expires, delta):
+            return value
+        locked = cache.add(lock_key, 1, settings.STAMPEDE_LOCK_SEC)
+        if not locked:
+            return value
+    else:
+        locked = cache.add(lock_key, 1, settings.STAMPEDE_LOCK_SEC)
+        if not locked:
+            entry = _wait(cache, key)
+            if entry is not None:
+                return entry[0]
+    try:
+        started = time.time()
+        value = compute()
+        now = time.time()
+        cache.set(
+            key,
+            (value, None if timeout is None else now + timeout,
+             now - started),
+            None if timeout is None else timeout + settings.STAMPEDE_STALE_SEC,
+        )
+        return value
+    finally:
+        # чужую блокировку не снимаем: ее владелец еще считает
+        if locked:
+            cache.delete(lock_key)
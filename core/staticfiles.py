@@ -0,0 +1,147 @@
+import gzip
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+COMPRESSIBLE = (
+    '.css', '.js', '.svg', '.ico', '.json', '.map', '.txt', '.xml', '.html',
+)
+CHUNK_SIZE = 64 * 1024
+
+
+def compress(path):
+    """Пишет path.gz рядом с файлом, если сжатие заметно его уменьшает.
+    mtime=0 — одинаковый файл дает одинаковый архив при каждом collectstatic.
+    """
+    with open(path, 'rb') as source:
+        data = source.read()
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data) * 0.95:
+        with open(path + '.gz', 'wb') as output:
+            output.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, которая после подстановки хэшей в имена
+    сохраняет рядом gzip-копии текстовых файлов."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        # файл может пройти несколько проходов подстановки хэшей,
+        # сжимается только окончательная версия
+        compressible = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if not isinstance(processed, Exception):
+                compressible.update(
+                    path for path in (name, hashed_name)
+                    if path and path.lower().endswith(COMPRESSIBLE)
+                )
+            yield name, hashed_name, processed
+        if not dry_run:
+            for path in compressible:
+                compress(self.path(path))
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        self.path = path
+        stat = os.stat(path)
+        content_type, _ = mimetypes.guess_type(path)
+        self.headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+            ('Cache-Control', (
+                f'public, max-age={settings.STATIC_IMMUTABLE_MAX_AGE}, '
+                'immutable'
+            ) if immutable else (
+                f'public, max-age={settings.STATIC_MAX_AGE}'
+            )),
+        ]
+        self.variants = {None: (path, stat.st_size)}
+        if os.path.exists(path + '.gz'):
+            self.variants['gzip'] = (
+                path + '.gz', os.path.getsize(path + '.gz')
+            )
+            self.headers.append(('Vary', 'Accept-Encoding'))
+        self.etag = f'"{int(stat.st_mtime)}-{stat.st_size}"'
+
+    def serve(self, environ, start_response):
+        encoding = (
+            'gzip' if 'gzip' in self.variants
+            and accepts_gzip(environ.get('HTTP_ACCEPT_ENCODING', ''))
+            else None
+        )
+        etag = self.etag[:-1] + (f'-{encoding}"' if encoding else '"')
+        headers = [*self.headers, ('ETag', etag)]
+        if etag in environ.get('HTTP_IF_NONE_MATCH', ''):
+            start_response('304 Not Modified', headers)
+            return []
+        path, size = self.variants[encoding]
+        headers.append(('Content-Length', str(size)))
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_ = open(path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(file_, CHUNK_SIZE)
+        return _chunks(file_)
+
+
+def _chunks(file_):
+    with file_:
+        yield from iter(lambda: file_.read(CHUNK_SIZE), b'')
+
+
+def accepts_gzip(header):
+    for coding in header.split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00')
+    return False
+
+
+def index(root, prefix):
+    """{url: StaticFile} для всех файлов STATIC_ROOT; файлы, имена которых
+    ManifestStaticFilesStorage снабдила хэшем, кэшируются навсегда."""
+    try:
+        with open(os.path.join(root, 'staticfiles.json')) as manifest:
+            hashed = set(json.load(manifest)['paths'].values())
+    except (OSError, ValueError, KeyError):
+        hashed = set()
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith('.gz'):
+                continue
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            files[prefix + relative] = StaticFile(path, relative in hashed)
+    return files
+
+
+class StaticFilesApplication:
+    """WSGI-обертка, которая отдает собранную статику из STATIC_ROOT, не
+    доходя до Django: заранее сжатые копии по Accept-Encoding, ETag и
+    вечный Cache-Control для файлов с хэшем в имени. Остальные запросы
+    уходят в application."""
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        root = root or settings.STATIC_ROOT
+        self.files = index(
+            root, prefix or settings.STATIC_URL
+        ) if root and os.path.isdir(root) else {}
+
+    def __call__(self, environ, start_response):
+        static = self.files.get(environ.get('PATH_INFO', ''))
+        if static is None or environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self.application(environ, start_response)
+        return static.serve(environ, start_response)
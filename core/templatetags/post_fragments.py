@@ -0,0 +1,11 @@
+from django import template
+
+from posts.fragments import render_posts
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_fragments(posts, get_author=True):
+    """Список готовых HTML-фрагментов постов страницы."""
+    return render_posts(posts, get_author)
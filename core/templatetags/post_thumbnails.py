@@ -0,0 +1,34 @@
+from django import template
+from django.conf import settings
+
+from posts.images import srcset
+from posts.thumbnails import cached_thumbnail, queue_thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(post, size):
+    """Готовая миниатюра размера из THUMBNAIL_SIZES или None.
+
+    Берет результат posts.thumbnails.prefetch_thumbnails, если он есть.
+    Иначе читает KV-хранилище, а при промахе ставит миниатюру в очередь
+    и шаблон показывает заглушку: ресайз никогда не выполняется внутри запроса.
+    """
+    if not post.image:
+        return None
+    prefetched = getattr(post, 'thumbnails', {})
+    if size in prefetched:
+        return prefetched[size]
+    geometry, options = settings.THUMBNAIL_SIZES[size]
+    thumbnail = cached_thumbnail(post.image, geometry, **options)
+    if thumbnail is None:
+        queue_thumbnails(post.image, ((geometry, options),))
+    return thumbnail
+
+
+@register.simple_tag
+def image_srcset(post):
+    """srcset картинки поста из копий, записанных при загрузке; пустая
+    строка для картинок, загруженных до нормализации."""
+    return srcset(post)
@@ -0,0 +1,62 @@
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import Library, TemplateSyntaxError, VariableDoesNotExist
+from django.templatetags.cache import CacheNode, do_cache
+
+from core.stampede import get_or_set
+
+register = Library()
+
+
+class StampedeCacheNode(CacheNode):
+    """CacheNode, который пересчитывает истекший фрагмент в одном запросе,
+    а остальным отдает прежний HTML."""
+
+    def _resolve(self, var, context):
+        try:
+            return var.resolve(context)
+        except VariableDoesNotExist:
+            raise TemplateSyntaxError(
+                f'"cache" tag got an unknown variable: {var.var!r}'
+            )
+
+    def render(self, context):
+        expire_time = self._resolve(self.expire_time_var, context)
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise TemplateSyntaxError(
+                    '"cache" tag got a non-integer timeout value: '
+                    f'{expire_time!r}'
+                )
+        name = (
+            self._resolve(self.cache_name, context)
+            if self.cache_name else None
+        )
+        try:
+            fragment_cache = caches[name or 'template_fragments']
+        except InvalidCacheBackendError:
+            if name:
+                raise TemplateSyntaxError(
+                    f'Invalid cache name specified for cache tag: {name!r}'
+                )
+            fragment_cache = caches['default']
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_set(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+            cache=fragment_cache,
+        )
+
+
+@register.tag('cache')
+def do_stampede_cache(parser, token):
+    """{% cache %} с тем же синтаксисом, что во встроенной библиотеке
+    cache: достаточно заменить {% load cache %} на {% load stampede %}."""
+    node = do_cache(parser, token)
+    return StampedeCacheNode(
+        node.nodelist, node.expire_time_var, node.fragment_name,
+        node.vary_on, node.cache_name,
+    )
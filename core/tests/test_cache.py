@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import cache as sqlite_cache
+from ..cache import SQLiteCache
+
+
+def _increment(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_values_shared_between_instances(self):
+        other = self.make_cache()
+        self.cache.set_many({'a': {'x': 1}, 'b': 2, 'c': 'три'})
+        self.assertEqual(
+            other.get_many(['a', 'b', 'c', 'd']),
+            {'a': {'x': 1}, 'b': 2, 'c': 'три'},
+        )
+        self.assertFalse(other.add('a', 0))
+        self.assertTrue(other.add('d', True))
+        self.assertIs(self.cache.get('d'), True)
+        other.delete_many(['a', 'b'])
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('c'), 'три')
+
+    def test_expired_entries_are_invisible(self):
+        self.cache.set('short', 1, timeout=1)
+        self.cache.set('forever', 1, timeout=None)
+        with mock.patch('time.time', return_value=time.time() + 2):
+            self.assertIsNone(self.cache.get('short'))
+            self.assertFalse(self.cache.has_key('short'))
+            self.assertTrue(self.cache.add('short', 2))
+            self.assertEqual(self.cache.get('short'), 2)
+            self.assertEqual(self.cache.get('forever'), 1)
+
+    def test_incr_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_increment, args=(self.path, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        self.assertEqual(self.cache.incr('counter', -10), 190)
+        self.cache.set('ratio', 0.5)
+        self.assertEqual(self.cache.incr('ratio'), 1.5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    @mock.patch.object(sqlite_cache, 'CULL_CHECK_EVERY', 1)
+    def test_least_recently_read_evicted_first(self):
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=0)
+        cache.set_many({f'old{number}': number for number in range(10)})
+        with mock.patch('time.time', return_value=time.time() + 1):
+            self.assertEqual(cache.get('old0'), 0)
+            cache.set_many({f'new{number}': number for number in range(5)})
+        kept = cache.get_many([f'old{number}' for number in range(10)])
+        self.assertIn('old0', kept)
+        self.assertEqual(len(kept), 5)
+
+    @mock.patch.object(sqlite_cache, 'CULL_CHECK_EVERY', 1)
+    def test_size_bound(self):
+        cache = self.make_cache(MAX_SIZE=10000)
+        for number in range(20):
+            cache.set(f'blob{number}', b'x' * 1000)
+        kept = cache.get_many([f'blob{number}' for number in range(20)])
+        self.assertLessEqual(len(kept), 10)
+        self.assertIn('blob19', kept)
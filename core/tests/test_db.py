@@ -0,0 +1,52 @@
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+
+from ..db import retry_on_locked
+
+
+@override_settings(DB_WRITE_RETRIES=2, DB_WRITE_RETRY_DELAY=0)
+class DatabaseTuningTests(TestCase):
+
+    def test_pragmas_applied_on_new_connection(self):
+        """PRAGMA из настроек БД выполняются при подключении."""
+        wrapper = DatabaseWrapper(
+            {
+                **connection.settings_dict,
+                'NAME': ':memory:',
+                'PRAGMAS': {'cache_size': -1234, 'temp_store': 'MEMORY'},
+            },
+            alias='pragmas',
+        )
+        try:
+            with wrapper.cursor() as cursor:
+                cursor.execute('PRAGMA cache_size')
+                self.assertEqual(cursor.fetchone()[0], -1234)
+                cursor.execute('PRAGMA temp_store')
+                self.assertEqual(cursor.fetchone()[0], 2)
+        finally:
+            wrapper.close()
+
+    def test_locked_write_is_retried(self):
+        """Транзакция повторяется при «database is locked», другие ошибки
+        и исчерпанные попытки пробрасываются."""
+        calls = []
+
+        @retry_on_locked
+        def view(request, error):
+            calls.append(request)
+            if len(calls) < 3:
+                raise OperationalError(error)
+            return 'ok'
+
+        self.assertEqual(view('request', 'database is locked'), 'ok')
+        self.assertEqual(len(calls), 3)
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            view('request', 'no such table')
+        self.assertEqual(len(calls), 1)
+        calls.clear()
+        with override_settings(DB_WRITE_RETRIES=1):
+            with self.assertRaises(OperationalError):
+                view('request', 'database is locked')
+        self.assertEqual(len(calls), 2)
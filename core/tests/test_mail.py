@@ -0,0 +1,71 @@
+from unittest import mock
+
+from django.core import mail as outbox
+from django.core.mail import send_mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import User
+
+from .. import mail
+from ..models import SpooledEmail
+
+
+class BrokenBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP недоступен')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.SpoolEmailBackend',
+    EMAIL_SPOOL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_SPOOL_MAX_ATTEMPTS=2,
+)
+class SpoolEmailTests(TestCase):
+    def test_password_reset_only_enqueues(self):
+        """Сброс пароля кладет письмо в очередь, отправляет его воркер."""
+        User.objects.create_user(
+            username='mailer', email='m@example.com', password='secret'
+        )
+        self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'm@example.com'},
+        )
+        self.assertEqual(len(outbox.outbox), 0)
+        self.assertEqual(SpooledEmail.objects.count(), 1)
+        self.assertEqual(mail.deliver(), (1, 0))
+        self.assertEqual(outbox.outbox[0].to, ['m@example.com'])
+        self.assertFalse(SpooledEmail.objects.exists())
+
+    def test_batch_uses_one_connection(self):
+        for number in range(3):
+            send_mail('Тема', f'Текст {number}', None, ['a@example.com'])
+        with mock.patch.object(
+            EmailBackend, 'open', autospec=True, return_value=True
+        ) as opened:
+            self.assertEqual(mail.deliver(batch_size=2), (2, 0))
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(mail.deliver(), (1, 0))
+        self.assertEqual(
+            [message.body for message in outbox.outbox],
+            ['Текст 0', 'Текст 1', 'Текст 2'],
+        )
+
+    def test_failed_delivery_retried_then_given_up(self):
+        send_mail('Тема', 'Текст', None, ['a@example.com'])
+        with override_settings(
+            EMAIL_SPOOL_BACKEND='core.tests.test_mail.BrokenBackend'
+        ):
+            self.assertEqual(mail.deliver(), (0, 1))
+            email = SpooledEmail.objects.get()
+            self.assertEqual(email.attempts, 1)
+            self.assertIn('SMTP недоступен', email.last_error)
+            # письмо отложено до следующей попытки
+            self.assertEqual(mail.deliver(), (0, 0))
+            SpooledEmail.objects.update(next_attempt=timezone.now())
+            self.assertEqual(mail.deliver(), (0, 1))
+        self.assertTrue(SpooledEmail.objects.get().failed)
+        SpooledEmail.objects.update(next_attempt=timezone.now())
+        self.assertEqual(mail.deliver(), (0, 0))
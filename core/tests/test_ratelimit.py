@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from .. import ratelimit
+
+CREATE_URL = reverse('posts:post_create')
+
+
+@override_settings(RATE_LIMITS={'post_create': {'user': '2/m', 'ip': '3/m'}})
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other_writer')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def post(self, client=None):
+        return (client or self.client).post(CREATE_URL, {'text': 'Текст'})
+
+    def test_bucket_empties_and_refills(self):
+        """Сверх емкости ведра — 429 с Retry-After, через это время
+        запрос снова проходит."""
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            self.assertEqual(self.post().status_code, 302)
+            self.assertEqual(self.post().status_code, 302)
+            response = self.post()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Post.objects.count(), 2)
+        with mock.patch('core.ratelimit.time.time', return_value=1030.0):
+            self.assertEqual(self.post().status_code, 302)
+
+    def test_ip_bucket_shared_between_users(self):
+        other = Client()
+        other.force_login(self.other)
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            self.post()
+            self.post()
+            self.assertEqual(self.post(other).status_code, 302)
+            self.assertEqual(self.post(other).status_code, 429)
+        self.assertEqual(ratelimit.stats()['post_create'], {
+            'user': {'allowed': 3, 'denied': 0},
+            'ip': {'allowed': 3, 'denied': 1},
+        })
+
+    def test_form_page_not_limited(self):
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            for _ in range(5):
+                self.assertEqual(self.client.get(CREATE_URL).status_code, 200)
+
+    def test_interleaved_requests_do_not_lock_out(self):
+        """Второй запрос, пришедший между add и incr первого, не
+        сдвигает счетчик ведра сверх заработанного."""
+        backend = caches[settings.RATELIMIT_CACHE]
+        incr = backend.incr
+        interleaved = []
+
+        def racing_incr(key, delta=1, version=None):
+            value = incr(key, delta, version)
+            if not interleaved:
+                interleaved.append(None)
+                interleaved[0] = ratelimit.take(
+                    'post_create', 'ip', 'nat', '10/m'
+                )
+            return value
+
+        # у давно не использованного ведра запрос, проигравший подтягивание
+        # счетчика, проходит сверх емкости, но не блокирует ведро
+        for stale, expected in (
+            (False, [0] * 8 + [6, 6]), (True, [0] * 9 + [6])
+        ):
+            cache.clear()
+            interleaved.clear()
+            with mock.patch('core.ratelimit.time.time', return_value=1e9):
+                if stale:
+                    # ведро давно не использовалось: счетчик отстал
+                    cache.set(ratelimit.KEY.format(
+                        'post_create', 'ip', 'nat'
+                    ), 0)
+                with mock.patch.object(
+                    backend, 'incr', side_effect=racing_incr
+                ):
+                    first = ratelimit.take(
+                        'post_create', 'ip', 'nat', '10/m'
+                    )
+                self.assertEqual((first, interleaved), (0, [0]))
+                allowed = [
+                    ratelimit.take('post_create', 'ip', 'nat', '10/m')
+                    for _ in range(10)
+                ]
+                self.assertEqual(allowed, expected)
@@ -0,0 +1,87 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from .. import stampede
+
+
+@override_settings(STAMPEDE_WAIT_SEC=1, STAMPEDE_STALE_SEC=60)
+class StampedeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, value='свежее'):
+        def compute():
+            self.calls += 1
+            return value
+        return compute
+
+    def expire(self, key):
+        value, _, delta = cache.get(key)
+        cache.set(key, (value, time.time() - 1, delta), 60)
+
+    def test_fresh_value_computed_once(self):
+        for _ in range(3):
+            self.assertEqual(
+                stampede.get_or_set('key', self.compute(), 60), 'свежее'
+            )
+        self.assertEqual(self.calls, 1)
+        self.assertIsNone(cache.get(stampede.LOCK_KEY.format('key')))
+
+    def test_stale_value_served_while_other_request_recomputes(self):
+        stampede.get_or_set('key', self.compute('старое'), 60)
+        self.expire('key')
+        cache.add(stampede.LOCK_KEY.format('key'), 1)
+        self.assertEqual(
+            stampede.get_or_set('key', self.compute(), 60), 'старое'
+        )
+        self.assertEqual(self.calls, 1)
+        cache.delete(stampede.LOCK_KEY.format('key'))
+        self.assertEqual(
+            stampede.get_or_set('key', self.compute(), 60), 'свежее'
+        )
+
+    def test_miss_waits_for_lock_holder(self):
+        cache.add(stampede.LOCK_KEY.format('key'), 1)
+        holder = threading.Timer(
+            0.1, cache.set, ('key', ('чужое', time.time() + 60, 0), 60)
+        )
+        holder.start()
+        self.assertEqual(
+            stampede.get_or_set('key', self.compute(), 60), 'чужое'
+        )
+        holder.join()
+        self.assertEqual(self.calls, 0)
+
+    @override_settings(STAMPEDE_WAIT_SEC=0.1)
+    def test_miss_computed_when_lock_holder_is_too_slow(self):
+        cache.add(stampede.LOCK_KEY.format('key'), 1)
+        self.assertEqual(
+            stampede.get_or_set('key', self.compute(), 60), 'свежее'
+        )
+        # блокировка осталась за первым запросом
+        self.assertIsNotNone(cache.get(stampede.LOCK_KEY.format('key')))
+
+    def test_early_refresh_is_probabilistic(self):
+        cache.set('key', ('старое', time.time() + 1, 0.5), 60)
+        with mock.patch('random.random', return_value=0.0):
+            self.assertEqual(
+                stampede.get_or_set('key', self.compute(), 60), 'старое'
+            )
+        with mock.patch('random.random', return_value=0.99):
+            self.assertEqual(
+                stampede.get_or_set('key', self.compute(), 60), 'свежее'
+            )
+
+    def test_cache_tag(self):
+        template = Template(
+            '{% load stampede %}{% cache 60 fragment %}{{ value }}'
+            '{% endcache %}'
+        )
+        self.assertEqual(template.render(Context({'value': 1})), '1')
+        self.assertEqual(template.render(Context({'value': 2})), '1')
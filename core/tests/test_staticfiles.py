@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from ..staticfiles import StaticFilesApplication
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def downstream(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'django']
+
+
+@override_settings(
+    STATIC_ROOT=TEMP_STATIC_ROOT,
+    STATICFILES_STORAGE=(
+        'core.staticfiles.CompressedManifestStaticFilesStorage'
+    ),
+)
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(TEMP_STATIC_ROOT, 'staticfiles.json')) as f:
+            cls.css = json.load(f)['paths']['css/bootstrap.min.css']
+        cls.app = StaticFilesApplication(downstream)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def get(self, path, **environ):
+        result = {}
+
+        def start_response(status, headers):
+            result['status'] = status
+            result['headers'] = dict(headers)
+
+        body = b''.join(self.app({
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **environ
+        }, start_response))
+        return result['status'], result['headers'], body
+
+    def test_collect_writes_fingerprinted_gzip_copies(self):
+        self.assertNotEqual(self.css, 'css/bootstrap.min.css')
+        path = os.path.join(TEMP_STATIC_ROOT, self.css)
+        with open(path, 'rb') as source, open(path + '.gz', 'rb') as packed:
+            self.assertEqual(gzip.decompress(packed.read()), source.read())
+        # png уже сжат
+        self.assertFalse(os.path.exists(
+            os.path.join(TEMP_STATIC_ROOT, 'img', 'logo.png.gz')
+        ))
+
+    def test_gzip_negotiated_and_cached_forever(self):
+        url = settings.STATIC_URL + self.css
+        status, headers, body = self.get(
+            url, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        status, headers, plain = self.get(url)
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(gzip.decompress(body), plain)
+        status, _, _ = self.get(url, HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual(status, '304 Not Modified')
+
+    def test_unhashed_names_revalidated_and_other_urls_passed_on(self):
+        _, headers, _ = self.get(settings.STATIC_URL + 'img/logo.png')
+        self.assertNotIn('immutable', headers['Cache-Control'])
+        self.assertEqual(self.get('/')[2], b'django')
+
+    def test_html_responses_gzipped(self):
+        response = self.client.get(
+            reverse('about:author'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'<html', gzip.decompress(response.content))
@@ -0,0 +1,85 @@
+import time
+from io import StringIO
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.template import engines
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timing
+
+INDEX_URL = reverse('posts:index')
+
+
+@override_settings(TIMING_SAMPLE_RATE=1, TIMING_CACHE='default')
+class ServerTimingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_sampled_request_has_server_timing(self):
+        """Выбранный запрос получает заголовок Server-Timing с SQL,
+        шаблонами и кэшем."""
+        header = self.client.get(INDEX_URL)['Server-Timing']
+        for metric in ('total;dur=', 'sql;dur=', 'template;dur=', 'cache;'):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+        self.assertNotIn('desc="0 queries"', header)
+
+    @override_settings(TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_measured(self):
+        """Запросы вне выборки не замеряются и не попадают в отчет."""
+        response = self.client.get(INDEX_URL)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(timing.report(), {})
+
+    def test_histograms_aggregated_per_url_name(self):
+        """Замеры копятся по URL name и выводятся командой."""
+        for _ in range(3):
+            self.client.get(INDEX_URL)
+        row = timing.report()['posts:index']
+        self.assertEqual(row['requests'], 3)
+        self.assertEqual(sum(row['total']['histogram'].values()), 3)
+        self.assertGreater(row['sql_queries_per_request'], 0)
+        output = StringIO()
+        call_command('timing_report', reset=True, stdout=output)
+        self.assertIn('posts:index', output.getvalue())
+        self.assertEqual(timing.report(), {})
+
+    @override_settings(TIMING_CACHE='timing')
+    def test_nested_renders_and_partial_cache_hits(self):
+        """Вложенный рендер (фрагменты постов) не добавляет время шаблонов
+        повторно, а get_many считает промахом каждый ненайденный ключ."""
+        timing.instrument()
+        shared = caches['timing']
+        shared.clear()
+        shared.set('found', 1)
+        inner = engines['django'].from_string('{{ slow }}')
+        outer = engines['django'].from_string('{{ nested }}')
+        recorder = dict.fromkeys(
+            ('template', 'cache_hits', 'cache_misses'), 0
+        )
+        timing._local.recorder = recorder
+        try:
+            self.assertEqual(
+                shared.get_many(key for key in ('found', 'a', 'b')),
+                {'found': 1},
+            )
+            started = time.perf_counter()
+            outer.render({'nested': lambda: inner.render({
+                'slow': lambda: time.sleep(0.05),
+            })})
+            total = time.perf_counter() - started
+        finally:
+            timing._local.recorder = None
+        self.assertEqual(recorder['cache_hits'], 1)
+        self.assertEqual(recorder['cache_misses'], 2)
+        self.assertLessEqual(recorder['template'], total)
+
+    def test_bucket_bounds(self):
+        """Время попадает в корзину с ближайшей верхней границей."""
+        self.assertEqual(timing.BUCKETS[timing.bucket(0.5)], 1)
+        self.assertEqual(timing.BUCKETS[timing.bucket(7)], 10)
+        self.assertIsNone(timing.BUCKETS[timing.bucket(10 ** 6)])
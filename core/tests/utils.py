@@ -0,0 +1,18 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def on_commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """Выполняет на выходе хуки transaction.on_commit, зарегистрированные
+    внутри блока: TestCase никогда не коммитит свою транзакцию (аналог
+    captureOnCommitCallbacks(execute=True) из новых версий Django)."""
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    try:
+        yield
+    finally:
+        while len(connection.run_on_commit) > start:
+            _, callback = connection.run_on_commit.pop(start)
+            callback()
@@ -0,0 +1,238 @@
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import Template
+from django.urls import URLPattern, URLResolver, get_resolver
+
+# верхние границы корзин гистограммы, мс
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, None)
+TIMINGS = ('total', 'sql', 'template')
+COUNTERS = ('requests', 'sql_queries', 'cache_hits', 'cache_misses')
+KEY = 'timing:{}:{}'
+
+_local = threading.local()
+_instrumented = set()
+
+
+def _recorder():
+    return getattr(_local, 'recorder', None)
+
+
+def _timed(method, record):
+    """Оборачивает метод так, чтобы при активной выборке вызов шел через
+    record(recorder, method, *args, **kwargs)."""
+    def wrapper(*args, **kwargs):
+        recorder = _recorder()
+        if recorder is None:
+            return method(*args, **kwargs)
+        return record(recorder, method, *args, **kwargs)
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def _record_template(recorder, render, *args, **kwargs):
+    # render_to_string внутри тегов (фрагменты постов) идет через тот же
+    # Template.render: считается только рендер верхнего уровня
+    if getattr(_local, 'rendering', False):
+        return render(*args, **kwargs)
+    _local.rendering = True
+    started = time.perf_counter()
+    try:
+        return render(*args, **kwargs)
+    finally:
+        _local.rendering = False
+        recorder['template'] += time.perf_counter() - started
+
+
+def _record_get(recorder, get, *args, **kwargs):
+    result = get(*args, **kwargs)
+    recorder['cache_hits' if result is not None else 'cache_misses'] += 1
+    return result
+
+
+def _record_get_many(recorder, get_many, cache, keys, *args, **kwargs):
+    keys = list(keys)
+    result = get_many(cache, keys, *args, **kwargs)
+    recorder['cache_hits'] += len(result)
+    recorder['cache_misses'] += len(keys) - len(result)
+    return result
+
+
+def _instrument(cls, name, record):
+    if (cls, name) not in _instrumented:
+        _instrumented.add((cls, name))
+        setattr(cls, name, _timed(getattr(cls, name), record))
+
+
+def instrument():
+    """Один раз оборачивает рендер шаблонов и чтения из кэшей. Вне
+    выборки обертка стоит одной проверки thread-local."""
+    _instrument(Template, 'render', _record_template)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        _instrument(backend, 'get', _record_get)
+        # get_many из BaseCache вызывает get, свой есть не у всех бэкендов
+        if 'get_many' in vars(backend):
+            _instrument(backend, 'get_many', _record_get_many)
+
+
+def _sql_wrapper(recorder):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            recorder['sql'] += time.perf_counter() - started
+            recorder['sql_queries'] += 1
+    return wrapper
+
+
+def _suffixes():
+    yield from COUNTERS
+    for metric in TIMINGS:
+        yield f'{metric}:us'
+        for index in range(len(BUCKETS)):
+            yield f'{metric}:{index}'
+
+
+def bucket(ms):
+    for index, bound in enumerate(BUCKETS):
+        if bound is None or ms <= bound:
+            return index
+
+
+def _bump(cache, key, delta):
+    if not cache.add(key, delta, None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, None)
+
+
+def store(name, recorder):
+    """Добавляет замер запроса в гистограммы URL name в TIMING_CACHE;
+    счетчики общие для всех процессов, если общий кэш."""
+    cache = caches[settings.TIMING_CACHE]
+    for metric in TIMINGS:
+        ms = recorder[metric] * 1000
+        _bump(cache, KEY.format(name, f'{metric}:{bucket(ms)}'), 1)
+        _bump(cache, KEY.format(name, f'{metric}:us'), int(ms * 1000))
+    for counter in COUNTERS:
+        _bump(cache, KEY.format(name, counter), recorder.get(counter, 1))
+
+
+def url_names(resolver=None, namespace=''):
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = (
+                f'{namespace}{pattern.namespace}:' if pattern.namespace
+                else namespace
+            )
+            yield from url_names(pattern, prefix)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f'{namespace}{pattern.name}'
+
+
+def _percentile(counts, total, percent):
+    threshold = total * percent / 100
+    seen = 0
+    for bound, count in zip(BUCKETS, counts):
+        seen += count
+        if seen >= threshold:
+            return bound
+    return None
+
+
+def report():
+    """Сводка по URL name: число выборок, перцентили по корзинам
+    (верхняя граница, мс; None — больше последней) и средние."""
+    cache = caches[settings.TIMING_CACHE]
+    names = sorted(set(url_names()))
+    values = cache.get_many([
+        KEY.format(name, suffix) for name in names for suffix in _suffixes()
+    ])
+    result = {}
+    for name in names:
+        requests = values.get(KEY.format(name, 'requests'), 0)
+        if not requests:
+            continue
+        row = {'requests': requests}
+        for metric in TIMINGS:
+            counts = [
+                values.get(KEY.format(name, f'{metric}:{index}'), 0)
+                for index in range(len(BUCKETS))
+            ]
+            row[metric] = {
+                'mean_ms': round(values.get(
+                    KEY.format(name, f'{metric}:us'), 0
+                ) / requests / 1000, 3),
+                'p50_ms': _percentile(counts, requests, 50),
+                'p95_ms': _percentile(counts, requests, 95),
+                'p99_ms': _percentile(counts, requests, 99),
+                'histogram': dict(zip(map(str, BUCKETS), counts)),
+            }
+        for counter in COUNTERS[1:]:
+            row[f'{counter}_per_request'] = round(values.get(
+                KEY.format(name, counter), 0
+            ) / requests, 2)
+        result[name] = row
+    return result
+
+
+def reset():
+    caches[settings.TIMING_CACHE].delete_many([
+        KEY.format(name, suffix)
+        for name in set(url_names()) for suffix in _suffixes()
+    ])
+
+
+def server_timing(recorder):
+    return ', '.join((
+        f'total;dur={recorder["total"] * 1000:.1f}',
+        f'sql;dur={recorder["sql"] * 1000:.1f};'
+        f'desc="{recorder["sql_queries"]} queries"',
+        f'template;dur={recorder["template"] * 1000:.1f}',
+        f'cache;desc="{recorder["cache_hits"]} hits, '
+        f'{recorder["cache_misses"]} misses"',
+    ))
+
+
+class ServerTimingMiddleware:
+    """Для доли TIMING_SAMPLE_RATE запросов замеряет SQL, рендер
+    шаблонов, обращения к кэшу и общее время, отдает их в заголовке
+    Server-Timing и копит гистограммы по URL name (команда timing_report).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument()
+
+    def __call__(self, request):
+        if random.random() >= settings.TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        recorder = dict.fromkeys(
+            ('sql', 'template', 'sql_queries', 'cache_hits', 'cache_misses'),
+            0,
+        )
+        _local.recorder = recorder
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_sql_wrapper(recorder))
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.recorder = None
+        recorder['total'] = time.perf_counter() - started
+        response['Server-Timing'] = server_timing(recorder)
+        match = request.resolver_match
+        if match is not None and match.view_name:
+            store(match.view_name, recorder)
+        return response
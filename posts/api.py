@@ -0,0 +1,158 @@
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from .caching import _etag, feed_version
+from .feed import pull_heavy_authors
+from .models import Comment, FeedEntry, Post
+from .utils import COMMENT_ORDERING, POST_ORDERING, CursorPaginator
+
+# публичное имя поля -> лукап для .values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def respond(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def error(message, status=400):
+    return respond({'error': message}, status=status)
+
+
+def selected_fields(request, available):
+    """Поля из ?fields=a,b (по умолчанию все) в порядке запроса."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    fields = list(dict.fromkeys(
+        name.strip() for name in requested.split(',') if name.strip()
+    ))
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise ApiError(
+            'Неизвестные поля: {}. Доступны: {}'.format(
+                ', '.join(unknown), ', '.join(available)
+            )
+        )
+    return fields
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def _serializer(fields, lookups, prefix=''):
+    """Столбцы для .values() и функция, превращающая строку в словарь
+    ответа; экземпляры моделей не создаются."""
+    columns = [(name, prefix + lookups[name]) for name in fields]
+    storage = Post._meta.get_field('image').storage
+
+    def serialize(row):
+        item = {name: row[column] for name, column in columns}
+        if item.get('image'):
+            item['image'] = storage.url(item['image'])
+        elif 'image' in item:
+            item['image'] = None
+        return item
+
+    return [column for _, column in columns], serialize
+
+
+def page(request, queryset, lookups, ordering=POST_ORDERING, prefix='',
+         fields=None):
+    """Страница keyset-пагинации по queryset в виде JSON-совместимого
+    словаря с курсорами соседних страниц."""
+    if fields is None:
+        fields = selected_fields(request, lookups)
+    columns, serialize = _serializer(fields, lookups, prefix)
+    paginator = CursorPaginator(queryset, page_size(request), ordering)
+    paginator.object_list = queryset.values(
+        *dict.fromkeys((*columns, *paginator.fields))
+    )
+    rows = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'results': [serialize(row) for row in rows],
+        'next': rows.next_cursor,
+        'previous': rows.previous_cursor,
+    }
+
+
+def follow_page(request):
+    return page(
+        request,
+        FeedEntry.objects.filter(user=request.user),
+        POST_FIELDS,
+        prefix='post__',
+    )
+
+
+def post_detail(request, post_id):
+    """Пост со страницей комментариев; комментарии — отдельное поле
+    comments, его тоже можно не запрашивать через ?fields=."""
+    fields = selected_fields(request, [*POST_FIELDS, 'comments'])
+    columns, serialize = _serializer(
+        [name for name in fields if name != 'comments'], POST_FIELDS
+    )
+    row = Post.objects.filter(id=post_id).values(
+        *dict.fromkeys((*columns, 'id'))
+    ).first()
+    if row is None:
+        raise ApiError('Пост не найден', status=404)
+    data = serialize(row)
+    if 'comments' in fields:
+        data['comments'] = page(
+            request,
+            Comment.objects.filter(post=post_id),
+            COMMENT_FIELDS,
+            ordering=COMMENT_ORDERING,
+            fields=list(COMMENT_FIELDS),
+        )
+    return data
+
+
+def api_view(view):
+    """Превращает словарь, который вернула view, в JSON, а ApiError —
+    в ответ с ошибкой."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return respond(view(request, *args, **kwargs))
+        except ApiError as exc:
+            return error(str(exc), exc.status)
+    return wrapper
+
+
+def follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    # посты популярных авторов подтягиваются при чтении и меняют версию
+    pull_heavy_authors(request.user)
+    return _etag(request, feed_version(f'follow:{request.user.pk}'))
@@ -0,0 +1,287 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from core.db import atomic_with_retries, is_locked
+
+from . import dataset
+from .models import Group, Post, User
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'follow_index')
+API_VIEWS = ('api_index', 'api_group', 'api_profile', 'api_post', 'api_follow')
+
+
+def build_dataset(users=50, groups=5, posts=1000, comments=2000,
+                  follows=200, seed=0):
+    dataset.generate(
+        users=users, groups=groups, posts=posts, comments=comments,
+        follows=follows, seed=seed, prefix='bench_',
+    )
+
+
+def _targets():
+    """URL каждого измеряемого вида и пользователь, от имени которого
+    он запрашивается (None — гость)."""
+    reader = User.objects.filter(follower__isnull=False).first()
+    author = Post.objects.values_list('author__username', flat=True).first()
+    group = Group.objects.filter(posts_count__gt=0).first()
+    post = Post.objects.order_by('-comments_count').first()
+    return {
+        'index': (reverse('posts:index'), None),
+        'group_posts': (
+            reverse('posts:group_list', args=[group.slug]), None
+        ),
+        'profile': (reverse('posts:profile', args=[author]), None),
+        'post_detail': (
+            reverse('posts:post_detail', args=[post.id]), None
+        ),
+        'follow_index': (reverse('posts:follow_index'), reader),
+        'api_index': (reverse('posts:api_index'), None),
+        'api_group': (reverse('posts:api_group', args=[group.slug]), None),
+        'api_profile': (reverse('posts:api_profile', args=[author]), None),
+        'api_post': (reverse('posts:api_post', args=[post.id]), None),
+        'api_follow': (reverse('posts:api_follow'), reader),
+    }
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, round(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(url, user=None, requests=50, cold=False, query=None):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    timings, queries, sizes = [], [], []
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url, query or {})
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+        sizes.append(len(response.content))
+    return {
+        'url': url,
+        'status': response.status_code,
+        'requests': requests,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+
+
+def run(views=VIEWS, requests=50, cold=False, query=None):
+    targets = _targets()
+    return {
+        name: measure(*targets[name], requests=requests, cold=cold,
+                      query=query)
+        for name in views
+    }
+
+
+SQLITE_PROFILES = {
+    # как в settings.py: соединение на запрос, журнал отката
+    'default': {},
+    'production': settings.SQLITE_PRODUCTION,
+}
+
+
+def _sqlite_alias(profile, path, posts):
+    alias = f'bench_{profile}'
+    connections.databases[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        **SQLITE_PROFILES[profile],
+    }
+    call_command('migrate', database=alias, verbosity=0)
+    # bulk_create не отправляет сигналы, которые писали бы в default
+    User.objects.using(alias).bulk_create((User(username='bench_author'),))
+    author = User.objects.using(alias).get()
+    group = Group.objects.using(alias).create(
+        title='Группа', slug='bench'
+    )
+    Post.objects.using(alias).bulk_create(
+        (
+            Post(author_id=author.id, group_id=group.id, text=f'Пост {n}')
+            for n in range(posts)
+        ),
+        batch_size=500,
+    )
+    return alias
+
+
+def _write(alias):
+    """Запись как в post_create: чтение, вставка поста и счетчик группы
+    в одной транзакции."""
+    posts = Post.objects.using(alias)
+    author_id, group_id = posts.values_list('author_id', 'group_id')[0]
+    posts.bulk_create((
+        Post(author_id=author_id, group_id=group_id, text='Новый пост'),
+    ))
+    Group.objects.using(alias).filter(pk=group_id).update(posts_count=1)
+
+
+def _worker(alias, deadline, write, retries, stats):
+    done = errors = 0
+    while time.monotonic() < deadline:
+        try:
+            if not write:
+                list(Post.objects.using(alias).select_related(
+                    'author', 'group'
+                )[:settings.POSTS_PER_PAGE])
+            elif retries:
+                atomic_with_retries(_write, alias, using=alias)
+            else:
+                with transaction.atomic(using=alias):
+                    _write(alias)
+            done += 1
+        except OperationalError as error:
+            if not is_locked(error):
+                raise
+            errors += 1
+        # конец запроса: при CONN_MAX_AGE=0 соединение закрывается
+        connections[alias].close_if_unusable_or_obsolete()
+    connections[alias].close()
+    with stats['lock']:
+        kind = 'writes' if write else 'reads'
+        stats[kind] += done
+        stats[f'{kind[:-1]}_errors'] += errors
+
+
+def sqlite_throughput(profile, readers=4, writers=2, seconds=5,
+                      posts=2000):
+    """Пропускная способность параллельных чтений ленты и записей постов
+    во временной БД SQLite с настройками профиля."""
+    with tempfile.TemporaryDirectory() as directory:
+        alias = _sqlite_alias(
+            profile, os.path.join(directory, 'db.sqlite3'), posts
+        )
+        connections[alias].close()
+        stats = {
+            'lock': threading.Lock(),
+            'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0,
+        }
+        deadline = time.monotonic() + seconds
+        threads = [
+            threading.Thread(target=_worker, args=(
+                alias, deadline, write, profile != 'default', stats
+            ))
+            for write in [False] * readers + [True] * writers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        del connections.databases[alias]
+    del stats['lock']
+    return {
+        **stats,
+        'reads_per_sec': round(stats['reads'] / seconds, 1),
+        'writes_per_sec': round(stats['writes'] / seconds, 1),
+    }
+
+
+CACHE_BACKENDS = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'filebased': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': 'filebased',
+    },
+    'sqlite': {'BACKEND': 'core.cache.SQLiteCache', 'LOCATION': 'cache.db'},
+}
+# размер значения примерно как у HTML-фрагмента поста
+CACHE_VALUE = 'x' * 2000
+
+
+def _cache(name, directory, keys=0):
+    # все ключи помещаются в кэш: сравнивается скорость, а не вытеснение
+    params = {
+        **CACHE_BACKENDS[name], 'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': keys + 100},
+    }
+    location = params.get('LOCATION', '')
+    if location:
+        location = os.path.join(directory, location)
+    return import_string(params['BACKEND'])(location, params)
+
+
+def _cache_worker(cache, keys, deadline, page, results):
+    """Смесь операций как в лентах: get_many страницы фрагментов с
+    дозаписью промахов через set_many, одиночные set и incr счетчика."""
+    ops = increments = 0
+    while time.monotonic() < deadline:
+        roll = random.random()
+        if roll < 0.8:
+            wanted = random.sample(keys, page)
+            found = cache.get_many(wanted)
+            missing = {
+                key: CACHE_VALUE for key in wanted if key not in found
+            }
+            if missing:
+                cache.set_many(missing)
+        elif roll < 0.95:
+            cache.set(random.choice(keys), CACHE_VALUE)
+        else:
+            try:
+                cache.incr('counter')
+                increments += 1
+            except ValueError:
+                # счетчик вытеснен или лежит в памяти другого процесса
+                pass
+        ops += 1
+    results.put((ops, increments))
+
+
+def cache_throughput(name, processes=4, seconds=3, keys=2000, page=20):
+    """Операций в секунду у бэкенда кэша при processes параллельных
+    процессах и число потерянных incr: у LocMemCache счетчик в каждом
+    процессе свой, у FileBasedCache incr — это неатомарные get и set."""
+    context = multiprocessing.get_context('fork')
+    with tempfile.TemporaryDirectory() as directory:
+        cache = _cache(name, directory, keys)
+        names = [f'fragment:{number}' for number in range(keys)]
+        cache.set_many({key: CACHE_VALUE for key in names[:keys // 2]})
+        cache.set('counter', 0)
+        results = context.Queue()
+        deadline = time.monotonic() + seconds
+        workers = [
+            context.Process(target=_cache_worker, args=(
+                cache, names, deadline, page, results
+            ))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        totals = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        ops = sum(done for done, _ in totals)
+        increments = sum(done for _, done in totals)
+        counter = _cache(name, directory).get('counter') or 0
+    return {
+        'ops': ops,
+        'ops_per_sec': round(ops / seconds, 1),
+        'increments': increments,
+        'lost_increments': increments - counter,
+    }
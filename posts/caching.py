@@ -0,0 +1,187 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from core.stampede import get_or_set
+
+from . import replicas
+from .models import Follow, Group, Post, UserStats
+
+VERSION_KEY = 'feed_version:{}'
+
+
+def feed_version(feed):
+    """Текущая версия ленты.
+
+    Версия инициализируется отметкой времени, поэтому после сброса ключа
+    (или его вытеснения из кэша) она никогда не совпадет с прежней.
+    Пока версия моложе REPLICA_LAG_SEC, реплика может еще не видеть
+    изменение, и запрос дочитывает данные из основной БД.
+    """
+    key = VERSION_KEY.format(feed)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    if time.time_ns() - version < settings.REPLICA_LAG_SEC * 10 ** 9:
+        replicas.use_primary()
+    return version
+
+
+def invalidate(*feeds):
+    """Сбрасывает версии лент после коммита: иначе параллельный запрос
+    успел бы собрать страницу из старых данных под новой версией."""
+    keys = [VERSION_KEY.format(feed) for feed in feeds]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def post_feeds(post, *group_ids):
+    """Ленты, в которые попадает пост: главная, группа, профиль автора
+    и ленты подписок его подписчиков.
+
+    У автора с подписчиками сверх FEED_FANOUT_LIMIT вместо лент всех
+    подписчиков меняется версия author:<id>; ее сверяет
+    feed.pull_heavy_authors при чтении ленты подписок.
+    """
+    feeds = ['index', f'profile:{post.author_id}']
+    feeds += [
+        f'group:{group_id}'
+        for group_id in {post.group_id, *group_ids} if group_id is not None
+    ]
+    follower_ids = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)[:settings.FEED_FANOUT_LIMIT + 1])
+    if len(follower_ids) > settings.FEED_FANOUT_LIMIT:
+        feeds.append(f'author:{post.author_id}')
+    else:
+        feeds += [f'follow:{user_id}' for user_id in follower_ids]
+    return feeds
+
+
+def feed_count(feed, queryset):
+    """Число постов в ленте без своего счетчика: COUNT(*) выполняется
+    один раз на версию ленты."""
+    return cache.get_or_set(
+        f'count:{feed}:{feed_version(feed)}', queryset.count,
+        settings.CACHE_SEC,
+    )
+
+
+def feed_cache(request, feed):
+    """Контекст для {% cache %}: ключ зависит от ленты, ее версии,
+    страницы/курсора и того, авторизован ли зритель."""
+    return {
+        'cache_sec': settings.CACHE_SEC,
+        'cache_key': ':'.join((
+            feed,
+            str(feed_version(feed)),
+            request.GET.get('cursor') or request.GET.get('page') or '1',
+            str(int(request.user.is_authenticated)),
+        )),
+    }
+
+
+def _etag(request, *parts):
+    """ETag страницы: зависит от зрителя, параметров запроса и версий
+    данных на ней, вычисляется без рендера."""
+    return hashlib.md5(':'.join(map(str, (
+        request.user.pk, request.GET.urlencode(), *parts
+    ))).encode()).hexdigest()
+
+
+def index_etag(request):
+    return _etag(request, feed_version('index'))
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is not None:
+        return _etag(request, feed_version(f'group:{group_id}'))
+
+
+def profile_etag(request, username):
+    stats = UserStats.objects.filter(user__username=username).values_list(
+        'user_id', 'followers_count', 'following_count', 'comments_count'
+    ).first()
+    if stats is None:
+        return None
+    user_id, *counts = stats
+    # кнопка подписки зависит от подписок зрителя
+    viewer = (
+        feed_version(f'follow:{request.user.pk}')
+        if request.user.is_authenticated else None
+    )
+    return _etag(request, feed_version(f'profile:{user_id}'), viewer, *counts)
+
+
+def post_etag(request, post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'comments_count'
+    ).first()
+    if post is None:
+        return None
+    author_id, comments_count = post
+    # правка поста и число постов автора меняют версию его профиля,
+    # комментарии — версию comments:<id>
+    return _etag(
+        request, feed_version(f'profile:{author_id}'),
+        feed_version(f'comments:{post_id}'), comments_count,
+    )
+
+
+def _memoized(etag_func):
+    # ETag нужен и condition(), и кэшу ответа: считается один раз
+    def etag(request, *args, **kwargs):
+        if not hasattr(request, '_etag'):
+            request._etag = etag_func(request, *args, **kwargs)
+        return request._etag
+    return etag
+
+
+def _cached(view, etag_func, timeout):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        etag = etag_func(request, *args, **kwargs)
+        if etag is None or request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        def compute():
+            response = view(request, *args, **kwargs)
+            return (
+                response.status_code, response['Content-Type'],
+                response.content,
+            )
+        status, content_type, content = get_or_set(
+            f'response:{request.path}:{etag}', compute, timeout
+        )
+        return HttpResponse(content, content_type=content_type, status=status)
+    return wrapper
+
+
+def conditional(etag_func, cache_sec=None):
+    """condition() для страниц, зависящих от зрителя: браузер хранит их
+    только у себя и перепроверяет по ETag при каждом заходе, получая 304,
+    если ничего не изменилось.
+
+    С cache_sec тело ответа еще и кэшируется на сервере под этим ETag
+    через core.stampede: после изменения данных новую версию считает
+    один запрос."""
+    def decorator(view):
+        etag = etag_func
+        if cache_sec is not None:
+            etag = _memoized(etag_func)
+            view = _cached(view, etag, cache_sec)
+        return cache_control(private=True, no_cache=True)(
+            condition(etag_func=etag)(view)
+        )
+    return decorator
@@ -0,0 +1,72 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import (
+    Comment, Follow, Group, MediaFile, Post, User, UserStats
+)
+
+
+def _change(queryset, field, delta):
+    # Greatest не дает счетчику уйти в минус, если он уже рассинхронизирован
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def change_user(user_id, field, delta):
+    stats = UserStats.objects.filter(user_id=user_id)
+    if not _change(stats, field, delta):
+        UserStats.objects.bulk_create(
+            (UserStats(user_id=user_id),), ignore_conflicts=True
+        )
+        _change(stats, field, delta)
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def change_media(name, delta):
+    files = MediaFile.objects.filter(name=name)
+    if not _change(files, 'refs', delta) and delta > 0:
+        MediaFile.objects.bulk_create(
+            (MediaFile(name=name),), ignore_conflicts=True
+        )
+        _change(files, 'refs', delta)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount():
+    """Пересчитывает все счетчики пачкой UPDATE ... SET = (SELECT COUNT)."""
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True).iterator()
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    Group.objects.update(posts_count=_count(Post.objects, 'group'))
+    Post.objects.update(comments_count=_count(Comment.objects, 'post'))
+    UserStats.objects.update(
+        posts_count=_count(Post.objects, 'author'),
+        comments_count=_count(Comment.objects, 'author'),
+        followers_count=_count(Follow.objects, 'author'),
+        following_count=_count(Follow.objects, 'user'),
+    )
@@ -0,0 +1,273 @@
+import itertools
+import multiprocessing
+import random
+from array import array
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+
+from . import counters, feed, search
+from .models import Comment, Follow, Group, Post, User
+
+CHUNK_SIZE = 20000
+NO_GROUP_SHARE = 0.3
+
+# состояние воркера: заполняется в _init перед обработкой чанков
+_context = {}
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса закона Ципфа: первый элемент самый популярный."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def _init(context):
+    _context.clear()
+    _context.update(context)
+
+
+def _text(rng, low, high):
+    return ' '.join(rng.choices(_context['vocabulary'], k=rng.randint(
+        low, high
+    ))).capitalize()
+
+
+def _date(rng):
+    return _context['now'] - timedelta(seconds=rng.random() * _context['span'])
+
+
+def _users(rng, start, count):
+    names = _context['names']
+    start += _context['user_offset']
+    return [
+        {
+            'username': f'{_context["prefix"]}{rng.choice(names)}_{number}',
+            'first_name': rng.choice(names).capitalize(),
+            'password': '!',
+        }
+        for number in range(start, start + count)
+    ]
+
+
+def _groups(rng, start, count):
+    start += _context['group_offset']
+    return [
+        {
+            'title': _text(rng, 2, 4)[:200],
+            'slug': f'{_context["prefix"]}group-{number}',
+            'description': _text(rng, 10, 30),
+        }
+        for number in range(start, start + count)
+    ]
+
+
+def _posts(rng, start, count):
+    users, groups = _context['users'], _context['groups']
+    authors = rng.choices(users, cum_weights=_context['user_weights'], k=count)
+    return [
+        {
+            'author_id': author_id,
+            'group_id': (
+                None if not groups or rng.random() < NO_GROUP_SHARE
+                else rng.choices(
+                    groups, cum_weights=_context['group_weights']
+                )[0]
+            ),
+            'text': _text(rng, 5, 80),
+            'pub_date': pub_date,
+            'updated': pub_date,
+        }
+        for author_id, pub_date in zip(
+            authors, (_date(rng) for _ in authors)
+        )
+    ]
+
+
+def _comments(rng, start, count):
+    users, posts = _context['users'], _context['posts']
+    return [
+        {
+            'author_id': rng.choice(users),
+            'post_id': rng.choice(posts),
+            'text': _text(rng, 3, 30),
+            'created': _date(rng),
+        }
+        for _ in range(count)
+    ]
+
+
+def _follows(rng, start, count):
+    """Подписки пользователей с индексами [start, start + count).
+
+    У каждого подписчика свой набор авторов, поэтому пары не повторяются
+    между чанками; авторы выбираются по Ципфу — так появляются
+    «звезды» с огромным числом подписчиков.
+    """
+    users, weights = _context['users'], _context['user_weights']
+    per_user, extra = divmod(_context['follows'], len(users))
+    follows = []
+    for index in range(start, start + count):
+        user_id = users[index]
+        wanted = min(per_user + (index < extra), len(users) - 1)
+        authors = set()
+        for _ in range(10):
+            authors.update(rng.choices(
+                users, cum_weights=weights, k=wanted - len(authors)
+            ))
+            authors.discard(user_id)
+            if len(authors) >= wanted:
+                break
+        while len(authors) < wanted:
+            author_id = rng.choice(users)
+            if author_id != user_id:
+                authors.add(author_id)
+        follows.extend(
+            {'user_id': user_id, 'author_id': author_id}
+            for author_id in itertools.islice(authors, wanted)
+        )
+    return follows
+
+
+MAKERS = {
+    'users': (User, _users),
+    'groups': (Group, _groups),
+    'posts': (Post, _posts),
+    'comments': (Comment, _comments),
+    'follows': (Follow, _follows),
+}
+
+
+def _fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+
+
+def _chunk(task):
+    """Строит строки чанка, уже приведенные к значениям для БД, чтобы
+    пишущему процессу оставалось только выполнить INSERT."""
+    kind, start, count, seed = task
+    model, maker = MAKERS[kind]
+    rng = random.Random(f'{seed}:{kind}:{start}')
+    fields = _fields(model)
+    defaults = {field.attname: field.get_default() for field in fields}
+    return [
+        tuple(
+            field.get_db_prep_save(
+                values.get(field.attname, defaults[field.attname]),
+                connection,
+            )
+            for field in fields
+        )
+        for values in maker(rng, start, count)
+    ]
+
+
+def _insert(kind, total, context, seed, workers, progress, units=None):
+    """Пишет строки чанками: каждый чанк — одна транзакция с executemany.
+    Воркеры только готовят строки, пишет в БД один процесс."""
+    units = total if units is None else units
+    tasks = [
+        (kind, start, min(CHUNK_SIZE, units - start), seed)
+        for start in range(0, units, CHUNK_SIZE)
+    ]
+    model, _ = MAKERS[kind]
+    fields = _fields(model)
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    if workers > 1 and len(tasks) > 1:
+        pool = multiprocessing.get_context('fork').Pool(
+            workers, initializer=_init, initargs=(context,)
+        )
+        chunks = pool.imap(_chunk, tasks)
+    else:
+        pool = None
+        _init(context)
+        chunks = map(_chunk, tasks)
+    done = 0
+    try:
+        for rows in chunks:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            done += len(rows)
+            if progress is not None:
+                progress(kind, done, total)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def _last_pk(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+def _ids(model, since):
+    return array('q', model.objects.filter(pk__gt=since).order_by(
+        'pk'
+    ).values_list('pk', flat=True).iterator())
+
+
+def generate(users=1000, groups=20, posts=10000, comments=20000,
+             follows=20000, seed=0, workers=1, skew=1.1, days=365,
+             prefix='gen_', derived=True, progress=None):
+    """Заполняет БД реалистичными данными для нагрузочных проверок.
+
+    Авторы постов, популярность авторов у подписчиков и группы
+    распределены по Ципфу с показателем skew. Строки пишутся напрямую,
+    минуя сигналы, поэтому счетчики, ленты подписок и поисковый индекс
+    пересчитываются в конце (derived=False — пропустить этот шаг).
+    """
+    faker = Faker('ru_RU')
+    faker.seed_instance(seed)
+    context = {
+        'prefix': prefix,
+        'now': timezone.now(),
+        'span': timedelta(days=days).total_seconds(),
+        'vocabulary': faker.words(2000),
+        'names': [faker.user_name() for _ in range(1000)],
+        'follows': follows,
+    }
+    last_user, last_group, last_post = (
+        _last_pk(model) for model in (User, Group, Post)
+    )
+    # номера в username и slug продолжают pk: повторный запуск с тем же
+    # prefix и seed дописывает данные, а не повторяет имена
+    context['user_offset'] = last_user
+    context['group_offset'] = last_group
+    _insert('users', users, context, seed, workers, progress)
+    _insert('groups', groups, context, seed, workers, progress)
+    context['users'] = _ids(User, last_user)
+    context['groups'] = _ids(Group, last_group)
+    # популярность пользователя не должна зависеть от порядка создания
+    random.Random(seed).shuffle(context['users'])
+    context['user_weights'] = zipf_weights(len(context['users']), skew)
+    context['group_weights'] = zipf_weights(len(context['groups']), skew)
+    if context['users']:
+        _insert('posts', posts, context, seed, workers, progress)
+        context['posts'] = _ids(Post, last_post)
+        if context['posts']:
+            _insert('comments', comments, context, seed, workers,
+                    progress)
+    if len(context['users']) > 1:
+        follows = min(
+            follows, len(context['users']) * (len(context['users']) - 1)
+        )
+        context['follows'] = follows
+        _insert('follows', follows, context, seed, workers, progress,
+                units=len(context['users']))
+    if derived:
+        counters.recount()
+        feed.rebuild()
+        search.rebuild()
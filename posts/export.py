@@ -0,0 +1,66 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+FORMATS = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+COLUMNS = ('type', 'id', 'post_id', 'group', 'date', 'text', 'image')
+
+
+def records(author):
+    """Посты и комментарии автора по одной записи; строки читаются из БД
+    пачками по EXPORT_CHUNK_SIZE, память не растет с числом записей."""
+    posts = Post.objects.filter(author=author).order_by('id').values_list(
+        'id', 'group__slug', 'pub_date', 'text', 'image'
+    )
+    for post_id, group, pub_date, text, image in posts.iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    ):
+        yield {
+            'type': 'post',
+            'id': post_id,
+            'group': group,
+            'date': pub_date,
+            'text': text,
+            'image': image,
+        }
+    comments = Comment.objects.filter(author=author).order_by(
+        'id'
+    ).values_list('id', 'post_id', 'created', 'text')
+    for comment_id, post_id, created, text in comments.iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    ):
+        yield {
+            'type': 'comment',
+            'id': comment_id,
+            'post_id': post_id,
+            'date': created,
+            'text': text,
+        }
+
+
+class _Echo:
+    """Буфер для csv.writer, который сразу отдает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def stream(author, export_format):
+    """Генератор строк выгрузки в формате jsonl или csv."""
+    if export_format == 'csv':
+        writer = csv.DictWriter(_Echo(), COLUMNS)
+        yield writer.writeheader()
+        for record in records(author):
+            yield writer.writerow(record)
+        return
+    for record in records(author):
+        yield json.dumps(
+            record, cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import graph
+from .caching import feed_version, invalidate
+from .models import FeedEntry, Follow, Post, UserStats
+
+BATCH_SIZE = 500
+HEAVY_SEEN_KEY = 'heavy_seen:{}'
+
+
+def _entries(user_id, posts):
+    return [
+        FeedEntry(
+            user_id=user_id,
+            post_id=post['id'],
+            author_id=post['author_id'],
+            pub_date=post['pub_date'],
+        )
+        for post in posts
+    ]
+
+
+def _recent_posts(author_ids, since=None):
+    posts = Post.objects.filter(author_id__in=author_ids)
+    if since is not None:
+        posts = posts.filter(pub_date__gt=since)
+    return posts.order_by('-pub_date', '-id').values(
+        'id', 'author_id', 'pub_date'
+    )[:settings.FEED_BACKFILL_SIZE]
+
+
+def fan_out_post(post):
+    """Раздает новый пост в ленты подписчиков автора.
+
+    Посты авторов, у которых подписчиков больше FEED_FANOUT_LIMIT, не
+    раздаются: подписчики подтягивают их сами при чтении ленты.
+    """
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id).values_list(
+            'user_id', flat=True
+        )[:settings.FEED_FANOUT_LIMIT + 1]
+    )
+    if len(follower_ids) > settings.FEED_FANOUT_LIMIT:
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                post_id=post.id,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in follower_ids
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    FeedEntry.objects.bulk_create(
+        _entries(user_id, _recent_posts((author_id,))),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def pull_heavy_authors(user):
+    """Fan-out-on-read для популярных авторов, на которых подписан user.
+
+    Правки и удаления их постов меняют не ленты подписчиков, а версии
+    author:<id>; если они изменились с прошлого чтения, сбрасывается
+    версия ленты подписок user.
+    """
+    heavy_ids = sorted(
+        author_id
+        for author_id, count in graph.follower_counts(
+            graph.following_ids(user.id)
+        ).items()
+        if count > settings.FEED_FANOUT_LIMIT
+    )
+    if not heavy_ids:
+        return
+    since = FeedEntry.objects.filter(
+        user=user, author_id__in=heavy_ids
+    ).aggregate(last=Max('pub_date'))['last']
+    entries = _entries(user.id, _recent_posts(heavy_ids, since))
+    if entries:
+        FeedEntry.objects.bulk_create(
+            entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+    seen_key = HEAVY_SEEN_KEY.format(user.id)
+    versions = [
+        (author_id, feed_version(f'author:{author_id}'))
+        for author_id in heavy_ids
+    ]
+    changed = cache.get(seen_key) != versions
+    if changed:
+        cache.set(seen_key, versions, None)
+    if entries or changed:
+        invalidate(f'follow:{user.id}')
+
+
+def follow_feed(user):
+    pull_heavy_authors(user)
+    return FeedEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    )
+
+
+REBUILD_SQL = """
+INSERT INTO {feed} (user_id, post_id, author_id, pub_date)
+SELECT f.user_id, p.id, p.author_id, p.pub_date
+FROM {follow} f
+JOIN {post} p ON p.id IN (
+    SELECT id FROM {post}
+    WHERE author_id = f.author_id
+    ORDER BY pub_date DESC, id DESC
+    LIMIT %s
+)
+WHERE f.author_id NOT IN (
+    SELECT user_id FROM {stats} WHERE followers_count > %s
+)
+"""
+
+
+def rebuild():
+    """Пересобирает материализованные ленты по всем подпискам одним
+    INSERT ... SELECT: последние посты автора для каждой подписки
+    выбираются по индексу post_author_feed_idx."""
+    sql = REBUILD_SQL.format(
+        feed=FeedEntry._meta.db_table,
+        follow=Follow._meta.db_table,
+        post=Post._meta.db_table,
+        stats=UserStats._meta.db_table,
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        FeedEntry.objects.all().delete()
+        cursor.execute(sql, (
+            settings.FEED_BACKFILL_SIZE, settings.FEED_FANOUT_LIMIT
+        ))
@@ -1,5 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
 
+from . import images
 from .models import Post, Comment
 
 
@@ -13,6 +16,34 @@ class PostForm(forms.ModelForm):
             'image': 'Прикрепите файл',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            try:
+                return images.normalize(image)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                # ImageField проверяет только заголовок, битый файл
+                # обнаруживается при полном декодировании
+                raise forms.ValidationError(
+                    'Не удалось прочитать изображение: файл поврежден.',
+                    code='invalid_image',
+                )
+        return image
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            image = self.cleaned_data.get('image')
+            normalized = hasattr(image, 'image')
+            self.instance.image_width = (
+                image.image.width if normalized else None
+            )
+            self.instance.image_variants = (
+                images.write_variants(
+                    image, Post._meta.get_field('image')
+                ) if normalized else ''
+            )
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,51 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .thumbnails import prefetch_thumbnails
+
+FRAGMENT_TEMPLATE = 'posts/includes/posts_list.html'
+FRAGMENT_SIZE = 'feed'
+KEY = 'post_fragment:{}'
+
+
+def fragment_key(post, get_author):
+    """Ключ фрагмента поста: меняется вместе с post.updated и всем, что
+    фрагмент показывает помимо полей поста (автор, группа, миниатюра)."""
+    thumbnail = post.thumbnails.get(FRAGMENT_SIZE)
+    group = post.group
+    parts = (
+        post.id,
+        post.updated.isoformat(),
+        int(bool(get_author)),
+        post.image.name,
+        thumbnail.url if thumbnail else '',
+        post.author.username,
+        post.author.get_full_name(),
+        group.slug if group else '',
+        group.title if group else '',
+    )
+    return KEY.format(
+        hashlib.md5('\0'.join(map(str, parts)).encode()).hexdigest()
+    )
+
+
+def render_posts(posts, get_author):
+    """HTML постов страницы: готовые фрагменты берутся одним get_many,
+    недостающие рендерятся и кладутся в кэш одним set_many."""
+    posts = list(posts)
+    prefetch_thumbnails(posts, FRAGMENT_SIZE)
+    keys = [fragment_key(post, get_author) for post in posts]
+    fragments = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in fragments:
+            fragments[key] = missing[key] = render_to_string(
+                FRAGMENT_TEMPLATE, {'post': post, 'get_author': get_author}
+            )
+    if missing:
+        cache.set_many(missing, settings.POST_FRAGMENT_SEC)
+    return [mark_safe(fragments[key]) for key in keys]
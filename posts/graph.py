@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Follow, UserStats
+
+FOLLOWING_KEY = 'following:{}'
+FOLLOWERS_KEY = 'followers_count:{}'
+
+
+def following_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь.
+
+    Записи графа живут в кэше FOLLOW_GRAPH_SEC, поэтому читаются из
+    основной БД: отстающая реплика надолго закэшировала бы старые подписки.
+    """
+    key = FOLLOWING_KEY.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Follow.objects.using(DEFAULT_DB_ALIAS).filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True))
+        cache.set(key, ids, settings.FOLLOW_GRAPH_SEC)
+    return ids
+
+
+def is_following(user, author):
+    return (
+        user.is_authenticated
+        and user.pk != author.pk
+        and author.pk in following_ids(user.pk)
+    )
+
+
+def follower_counts(author_ids):
+    """Число подписчиков каждого автора: одно чтение из кэша, за
+    недостающими — один запрос к UserStats."""
+    keys = {author_id: FOLLOWERS_KEY.format(author_id)
+            for author_id in author_ids}
+    cached = cache.get_many(keys.values())
+    counts = {
+        author_id: cached[key]
+        for author_id, key in keys.items() if key in cached
+    }
+    missing = [author_id for author_id in keys if author_id not in counts]
+    if missing:
+        found = dict.fromkeys(missing, 0)
+        # как и в following_ids, не из реплики
+        found.update(UserStats.objects.using(DEFAULT_DB_ALIAS).filter(
+            user_id__in=missing
+        ).values_list('user_id', 'followers_count'))
+        cache.set_many(
+            {keys[author_id]: count for author_id, count in found.items()},
+            settings.FOLLOW_GRAPH_SEC,
+        )
+        counts.update(found)
+    return counts
+
+
+def forget(user_id, author_id):
+    """Сбрасывает записи графа, которые меняет подписка user на author,
+    после коммита: до него их перечитали бы из старых данных."""
+    keys = (FOLLOWING_KEY.format(user_id), FOLLOWERS_KEY.format(author_id))
+    transaction.on_commit(lambda: cache.delete_many(keys))
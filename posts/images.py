@@ -0,0 +1,98 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+FORMATS = {
+    # формат Pillow -> расширение файла
+    'JPEG': '.jpg',
+    'WEBP': '.webp',
+}
+
+
+def _has_alpha(image):
+    return (
+        image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    )
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        image.save(
+            buffer, 'JPEG', quality=settings.IMAGE_QUALITY,
+            optimize=True, progressive=True,
+        )
+    else:
+        image.save(buffer, image_format, quality=settings.IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def normalize(upload):
+    """Перекодирует загруженную картинку: поворот по EXIF, уменьшение до
+    IMAGE_MAX_SIZE и запись в IMAGE_FORMAT (с прозрачностью — в WebP)
+    без метаданных. Возвращает ContentFile с новым расширением.
+
+    JPEG уменьшается еще при декодировании (draft): 20-мегапиксельный
+    снимок не распаковывается целиком.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    max_size = settings.IMAGE_MAX_SIZE
+    # draft сохраняет размер не меньше запрошенного, точный ресайз ниже
+    image.draft('RGB', (max_size, max_size))
+    image = ImageOps.exif_transpose(image)
+    if _has_alpha(image):
+        image_format, mode = 'WEBP', 'RGBA'
+    else:
+        image_format, mode = settings.IMAGE_FORMAT, 'RGB'
+    image = image.convert(mode)
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    content = ContentFile(
+        _encode(image, image_format), name=stem + FORMATS[image_format]
+    )
+    content.image = image
+    return content
+
+
+def write_variants(content, field):
+    """Пишет рядом с картинкой уменьшенные копии ширин IMAGE_VARIANTS
+    (только меньше исходной) в хранилище поля field. Возвращает строку
+    «имя ширина, ...» для Post.image_variants."""
+    image = content.image
+    stem, extension = os.path.splitext(content.name)
+    image_format = next(
+        name for name, ext in FORMATS.items() if ext == extension
+    )
+    variants = []
+    for width in sorted(settings.IMAGE_VARIANTS):
+        if width >= image.width:
+            break
+        height = max(1, round(image.height * width / image.width))
+        name = field.storage.save(
+            field.generate_filename(None, f'{stem}_{width}w{extension}'),
+            ContentFile(_encode(
+                image.resize((width, height), Image.LANCZOS), image_format
+            )),
+        )
+        variants.append(f'{name} {width}')
+    return ', '.join(variants)
+
+
+def srcset(post):
+    """Значение srcset: варианты и сама картинка с их ширинами."""
+    if not post.image or not post.image_width:
+        return ''
+    storage = post.image.storage
+    candidates = [
+        f'{storage.url(name)} {width}w'
+        for name, width in (
+            variant.rsplit(' ', 1)
+            for variant in post.image_variants.split(', ') if variant
+        )
+    ]
+    candidates.append(f'{post.image.url} {post.image_width}w')
+    return ', '.join(candidates)
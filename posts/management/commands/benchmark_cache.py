@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает LocMemCache, FileBasedCache и SQLiteCache при '
+        'нескольких процессах: операций в секунду и потерянные incr'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=3)
+        parser.add_argument('--keys', type=int, default=2000)
+        parser.add_argument(
+            '--backend', action='append',
+            choices=list(benchmark.CACHE_BACKENDS),
+            help='По умолчанию все бэкенды',
+        )
+        parser.add_argument(
+            '--json', dest='json_path',
+            help='Файл для машиночитаемого отчета',
+        )
+
+    def handle(self, *args, **options):
+        results = {
+            name: benchmark.cache_throughput(
+                name,
+                processes=options['processes'],
+                seconds=options['seconds'],
+                keys=options['keys'],
+            )
+            for name in options['backend'] or benchmark.CACHE_BACKENDS
+        }
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump(results, output, indent=2)
+        self.stdout.write(
+            f'{"backend":<12}{"ops/s":>10}{"incr":>10}{"lost incr":>10}'
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<12}{row["ops_per_sec"]:>10}'
+                f'{row["increments"]:>10}{row["lost_increments"]:>10}'
+            )
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность параллельных чтений и записей '
+        'SQLite с настройками по умолчанию и продакшен-профилем'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument(
+            '--json', dest='json_path',
+            help='Файл для машиночитаемого отчета',
+        )
+
+    def handle(self, *args, **options):
+        results = {
+            profile: benchmark.sqlite_throughput(
+                profile,
+                readers=options['readers'],
+                writers=options['writers'],
+                seconds=options['seconds'],
+                posts=options['posts'],
+            )
+            for profile in benchmark.SQLITE_PROFILES
+        }
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump(results, output, indent=2)
+        self.stdout.write(
+            f'{"profile":<12}{"reads/s":>10}{"writes/s":>10}'
+            f'{"read err":>10}{"write err":>10}'
+        )
+        for profile, row in results.items():
+            self.stdout.write(
+                f'{profile:<12}{row["reads_per_sec"]:>10}'
+                f'{row["writes_per_sec"]:>10}{row["read_errors"]:>10}'
+                f'{row["write_errors"]:>10}'
+            )
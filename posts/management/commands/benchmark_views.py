@@ -0,0 +1,91 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, число запросов и размер ответа лент на '
+        'сгенерированных данных во временной тестовой БД'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Запросов на каждый вид',
+        )
+        parser.add_argument(
+            '--views', nargs='+',
+            choices=benchmark.VIEWS + benchmark.API_VIEWS,
+            default=benchmark.VIEWS,
+        )
+        parser.add_argument(
+            '--page', help='Значение ?page= для лент (глубокие страницы)',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--json', dest='json_path',
+            help='Файл для машиночитаемого отчета',
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            benchmark.build_dataset(
+                users=options['users'],
+                groups=options['groups'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+                seed=options['seed'],
+            )
+            results = benchmark.run(
+                views=options['views'],
+                requests=options['requests'],
+                cold=options['cold'],
+                query={'page': options['page']} if options['page'] else None,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        report = {
+            'dataset': {
+                name: options[name] for name in (
+                    'users', 'groups', 'posts', 'comments', 'follows', 'seed'
+                )
+            },
+            'requests': options['requests'],
+            'cold': options['cold'],
+            'page': options['page'],
+            'views': results,
+        }
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+        self.stdout.write(
+            f'{"view":<14}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+            f'{"queries":>9}{"bytes":>10}'
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<14}{row["p50_ms"]:>10}{row["p95_ms"]:>10}'
+                f'{row["p99_ms"]:>10}{row["queries"]:>9}{row["bytes"]:>10}'
+            )
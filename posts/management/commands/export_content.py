@@ -0,0 +1,55 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты и комментарии пользователей в отдельные файлы '
+        'JSON Lines или CSV'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи; по умолчанию все, у кого есть записи',
+        )
+        parser.add_argument(
+            '--format', dest='export_format', choices=export.FORMATS,
+            default='jsonl',
+        )
+        parser.add_argument('--output-dir', default='.')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(
+                users.values_list('username', flat=True)
+            )
+            if missing:
+                raise CommandError(
+                    f'Нет пользователей: {", ".join(sorted(missing))}'
+                )
+        else:
+            users = users.filter(stats__posts_count__gt=0) | users.filter(
+                stats__comments_count__gt=0
+            )
+        os.makedirs(options['output_dir'], exist_ok=True)
+        exported = 0
+        for user in users.only('id', 'username').iterator():
+            path = os.path.join(
+                options['output_dir'],
+                f'{user.username}.{options["export_format"]}',
+            )
+            with open(path, 'w', encoding='utf-8', newline='') as output:
+                output.writelines(
+                    export.stream(user, options['export_format'])
+                )
+            exported += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено пользователей: {exported}'
+        ))
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро заполняет БД сгенерированными пользователями, группами, '
+        'постами, комментариями и подписками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Процессов, строящих объекты параллельно',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель закона Ципфа для авторов и групп',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней разбросаны даты публикаций',
+        )
+        parser.add_argument(
+            '--prefix', default='gen_',
+            help='Префикс имен пользователей и адресов групп',
+        )
+        parser.add_argument(
+            '--no-derived', dest='derived', action='store_false',
+            help='Не пересчитывать счетчики, ленты и поисковый индекс',
+        )
+
+    def progress(self, kind, done, total):
+        self.stdout.write(f'{kind}: {done}/{total}')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        dataset.generate(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            seed=options['seed'],
+            workers=options['workers'],
+            skew=options['skew'],
+            days=options['days'],
+            prefix=options['prefix'],
+            derived=options['derived'],
+            progress=self.progress if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.monotonic() - started:.1f} с'
+        ))
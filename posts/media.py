@@ -0,0 +1,41 @@
+from django.db import transaction
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from . import counters
+from .models import MediaFile
+
+
+def file_names(image, variants):
+    """Файлы картинки поста: она сама и копии из image_variants."""
+    if not image:
+        return set()
+    return {str(image)} | {
+        variant.rsplit(' ', 1)[0]
+        for variant in variants.split(', ') if variant
+    }
+
+
+def acquire(names):
+    for name in names:
+        counters.change_media(name, 1)
+
+
+def release(names, storage):
+    """Уменьшает счетчики ссылок; файл, на который больше никто не
+    ссылается, удаляется вместе с миниатюрами после коммита.
+
+    Файлы, загруженные до появления счетчиков, не учтены в MediaFile и
+    не удаляются.
+    """
+    for name in names:
+        counters.change_media(name, -1)
+        deleted, _ = MediaFile.objects.filter(name=name, refs=0).delete()
+        if deleted:
+            transaction.on_commit(lambda name=name: _delete(name, storage))
+
+
+def _delete(name, storage):
+    # пока ждали коммита, те же байты могли загрузить снова
+    if not MediaFile.objects.filter(name=name).exists():
+        delete_thumbnails(ImageFile(name, storage))
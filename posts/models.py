@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import CheckConstraint, F, Q
+from django.db.models import CheckConstraint, F, Lookup, Q
+
+from .storage import ContentAddressedStorage
 
 
 User = get_user_model()
@@ -14,6 +16,11 @@ class Group(models.Model):
         verbose_name='Описание группы',
         blank=True,
     )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество постов',
+    )
 
     class Meta:
         ordering = ('title',)
@@ -32,6 +39,10 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата поста',
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -47,12 +58,44 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
+        blank=True,
+    )
+    # заполняются при загрузке, см. posts.images
+    image_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Ширина картинки',
+    )
+    image_variants = models.TextField(
         blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии картинки',
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев',
     )
 
     class Meta:
         ordering = ('-pub_date',)
         default_related_name = 'posts'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_feed_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_feed_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx',
+            ),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -60,6 +103,36 @@ class Post(models.Model):
         return self.text[:self.MAX_POST_LENGTH]
 
 
+class Match(Lookup):
+    """Полнотекстовое условие FTS5: <колонка> MATCH <запрос>."""
+
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class PostSearchIndex(models.Model):
+    """Виртуальная таблица FTS5 с текстами постов (rowid = id поста).
+
+    Таблица создается миграцией и заполняется posts.search; rank —
+    скрытая колонка FTS5 со значением bm25 для текущего MATCH.
+    """
+
+    rowid = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
+
+
+PostSearchIndex._meta.get_field('text').register_lookup(Match)
+
+
 class Comment(models.Model):
     MAX_COMMENT_LENGTH = 15
 
@@ -82,6 +155,12 @@ class Comment(models.Model):
     class Meta:
         ordering = ('-created',)
         default_related_name = 'comments'
+        indexes = (
+            models.Index(
+                fields=('post', '-created', '-id'),
+                name='comment_post_feed_idx',
+            ),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -116,3 +195,99 @@ class Follow(models.Model):
         )
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class UserStats(models.Model):
+    """Денормализованные счетчики пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов',
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество комментариев',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписок',
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class MediaFile(models.Model):
+    """Счетчик ссылок постов на файл в ContentAddressedStorage."""
+
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Имя файла',
+    )
+    refs = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество ссылок',
+    )
+
+    class Meta:
+        verbose_name = 'Медиафайл'
+        verbose_name_plural = 'Медиафайлы'
+
+    def __str__(self):
+        return self.name
+
+
+class FeedEntry(models.Model):
+    """Материализованная лента подписок: строка на пару (подписчик, пост)."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата поста')
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        unique_together = (('user', 'post'),)
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-id'),
+                name='feed_user_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_user_author_idx',
+            ),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
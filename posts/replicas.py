@@ -0,0 +1,77 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+
+
+def _replicas_allowed():
+    return (
+        getattr(_state, 'use_replica', False)
+        and not getattr(_state, 'wrote', False)
+    )
+
+
+def use_primary():
+    """Переводит чтения до конца текущего запроса в основную БД."""
+    _state.use_replica = False
+
+
+class ReplicaRouter:
+    """Читает из реплик только в запросах, которые пометил
+    ReplicaMiddleware; все записи и остальные чтения идут в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and _replicas_allowed():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # после записи запрос дочитывает свои же данные из основной БД
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """Отправляет GET-запросы к лентам (REPLICA_VIEWS) в реплики.
+
+    Клиент, который только что что-то записал, получает куку и
+    REPLICA_STICKY_SEC секунд читает из основной БД, чтобы видеть
+    собственные изменения несмотря на отставание реплик.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.use_replica = _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.use_replica = _state.wrote = False
+        if wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SEC
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.use_replica = bool(
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and STICKY_COOKIE not in request.COOKIES
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+        )
@@ -0,0 +1,70 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, OuterRef, Subquery, Value
+
+from .models import Post, PostSearchIndex
+
+FTS_TABLE = PostSearchIndex._meta.db_table
+TOKEN_RE = re.compile(r'\w+')
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def to_match(query):
+    """Безопасный запрос FTS5: каждое слово — префиксный терм в кавычках,
+    термы объединяются через AND."""
+    return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(query))
+
+
+def index_post(post):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', (post.pk,))
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            (post.pk, post.text),
+        )
+
+
+def unindex_post(post_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', (post_id,))
+
+
+def rebuild():
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}'
+        )
+
+
+def search_posts(query, queryset=None):
+    """Посты, подходящие под запрос, с аннотацией rank (меньше — лучше)."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    match = to_match(query)
+    if not match:
+        return queryset.annotate(
+            rank=Value(0.0, output_field=FloatField())
+        ).none()
+    if not fts_available():
+        return queryset.filter(text__icontains=query).annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+    index = PostSearchIndex.objects.filter(text__match=match)
+    return queryset.filter(id__in=index.values('rowid')).annotate(
+        rank=Subquery(
+            index.filter(rowid=OuterRef('id')).values('rank')[:1],
+            output_field=FloatField(),
+        )
+    )
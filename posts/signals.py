@@ -0,0 +1,88 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, counters, feed, graph, media, search
+from .models import Comment, Follow, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._saved_group_id, image, variants = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image', 'image_variants').first() or (
+            instance.group_id, '', ''
+        )
+        instance._saved_files = media.file_names(image, variants)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    search.index_post(instance)
+    files = media.file_names(instance.image, instance.image_variants)
+    saved_files = getattr(instance, '_saved_files', set())
+    media.acquire(files - saved_files)
+    media.release(saved_files - files, instance.image.storage)
+    if created:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        counters.change_group(instance.group_id, 1)
+        feed.fan_out_post(instance)
+        caching.invalidate(*caching.post_feeds(instance))
+        return
+    saved_group_id = getattr(instance, '_saved_group_id', instance.group_id)
+    if saved_group_id != instance.group_id:
+        counters.change_group(saved_group_id, -1)
+        counters.change_group(instance.group_id, 1)
+    caching.invalidate(*caching.post_feeds(instance, saved_group_id))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+    media.release(
+        media.file_names(instance.image, instance.image_variants),
+        instance.image.storage,
+    )
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    counters.change_group(instance.group_id, -1)
+    caching.invalidate(*caching.post_feeds(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post(instance.post_id, 1)
+        counters.change_user(instance.author_id, 'comments_count', 1)
+    caching.invalidate(f'comments:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_post(instance.post_id, -1)
+    counters.change_user(instance.author_id, 'comments_count', -1)
+    caching.invalidate(f'comments:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.user_id, 'following_count', 1)
+        counters.change_user(instance.author_id, 'followers_count', 1)
+        graph.forget(instance.user_id, instance.author_id)
+        feed.backfill(instance.user_id, instance.author_id)
+        caching.invalidate(f'follow:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.user_id, 'following_count', -1)
+    counters.change_user(instance.author_id, 'followers_count', -1)
+    graph.forget(instance.user_id, instance.author_id)
+    feed.prune(instance.user_id, instance.author_id)
+    caching.invalidate(f'follow:{instance.user_id}')
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под именем <каталог>/<ab>/<sha256><.ext>: одинаковое
+    содержимое лежит на диске один раз, а миниатюры sorl, имена которых
+    зависят от имени исходника, тоже общие.
+
+    Хэш считается по чанкам в том же проходе, что и запись во временный
+    файл рядом с целевым, поэтому загрузка не читается в память целиком.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # имя заменит хэш содержимого, совпадение имен — это дедупликация
+        return name
+
+    def _save(self, name, content):
+        directory, basename = posixpath.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(
+            dir=self.path(directory), suffix='.upload'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = posixpath.join(
+                directory, hexdigest[:2], hexdigest + extension
+            )
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(temp_path)
+                return name
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            # одновременная запись тех же байтов заменит файл тем же
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
@@ -0,0 +1,119 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.tests.utils import on_commit_callbacks
+
+from ..models import Comment, Follow, Group, Post, User
+
+API_INDEX_URL = reverse('posts:api_index')
+API_GROUP_URL = reverse('posts:api_group', args=['api_slug'])
+API_PROFILE_URL = reverse('posts:api_profile', args=['api_author'])
+API_FOLLOW_URL = reverse('posts:api_follow')
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='api_author')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api_slug', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {n}',
+                group=cls.group if n % 2 else None,
+            )
+            for n in range(6)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Коммент'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feeds_are_paginated_by_cursor(self):
+        """Ленты отдаются страницами, курсор ведет на следующую."""
+        expected = [post.id for post in reversed(self.posts)]
+        for url, ids in (
+            (API_INDEX_URL, expected),
+            (API_PROFILE_URL, expected),
+            (API_FOLLOW_URL, expected),
+            (API_GROUP_URL, [
+                post.id for post in reversed(self.posts)
+                if post.group_id
+            ]),
+        ):
+            with self.subTest(url=url):
+                first = self.client.get(url, {'limit': 2}).json()
+                self.assertEqual(
+                    [post['id'] for post in first['results']], ids[:2]
+                )
+                second = self.client.get(
+                    url, {'limit': 2, 'cursor': first['next']}
+                ).json()
+                self.assertEqual(
+                    [post['id'] for post in second['results']], ids[2:4]
+                )
+                self.assertIsNotNone(second['previous'])
+
+    def test_fields_selection(self):
+        """?fields= оставляет в ответе только запрошенные поля, неизвестные
+        поля дают 400."""
+        data = self.client.get(
+            API_INDEX_URL, {'fields': 'id,author'}
+        ).json()
+        self.assertEqual(
+            data['results'][0],
+            {'id': self.posts[-1].id, 'author': 'api_author'},
+        )
+        response = self.client.get(API_INDEX_URL, {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail_with_comments(self):
+        url = reverse('posts:api_post', args=[self.posts[0].id])
+        data = self.client.get(url).json()
+        self.assertEqual(data['text'], 'Пост 0')
+        self.assertEqual(
+            data['comments']['results'][0]['author'], 'api_reader'
+        )
+        data = self.client.get(url, {'fields': 'text'}).json()
+        self.assertEqual(data, {'text': 'Пост 0'})
+        missing = reverse('posts:api_post', args=[0])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_unchanged_feed_returns_not_modified(self):
+        response = self.client.get(API_INDEX_URL)
+        cached = self.client.get(
+            API_INDEX_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(cached.status_code, 304)
+        with on_commit_callbacks():
+            Post.objects.create(author=self.author, text='Новый')
+        fresh = self.client.get(
+            API_INDEX_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(fresh.status_code, 200)
+
+    def test_feeds_do_not_build_model_instances(self):
+        """Страница ленты читается одним запросом к БД."""
+        with self.assertNumQueries(1):
+            Client().get(API_INDEX_URL, HTTP_IF_NONE_MATCH='"stale"')
+
+    def test_response_cached_until_feed_changes(self):
+        client = Client()
+        first = client.get(API_INDEX_URL).json()
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(API_INDEX_URL).json(), first)
+        with on_commit_callbacks():
+            Post.objects.create(author=self.author, text='Новый пост')
+        data = client.get(API_INDEX_URL).json()
+        self.assertEqual(data['results'][0]['text'], 'Новый пост')
+
+    def test_follow_requires_login(self):
+        self.assertEqual(Client().get(API_FOLLOW_URL).status_code, 401)
@@ -0,0 +1,39 @@
+from django.test import TestCase
+
+from .. import benchmark
+from ..models import Comment, FeedEntry, Follow, Post
+
+
+class BenchmarkTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        benchmark.build_dataset(
+            users=10, groups=2, posts=60, comments=30, follows=15
+        )
+
+    def test_dataset_is_built(self):
+        """Набор данных создается вместе с лентами подписок."""
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertEqual(Follow.objects.count(), 15)
+        self.assertTrue(FeedEntry.objects.exists())
+
+    def test_report_covers_all_views(self):
+        """Отчет содержит перцентили, запросы и размер для каждого вида."""
+        report = benchmark.run(requests=3)
+        self.assertEqual(set(report), set(benchmark.VIEWS))
+        for name, row in report.items():
+            with self.subTest(view=name):
+                self.assertEqual(row['status'], 200)
+                self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+                self.assertGreater(row['queries'], 0)
+                self.assertGreater(row['bytes'], 0)
+
+    def test_percentile_uses_nearest_rank(self):
+        """Перцентиль считается по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+
+from .. import counters, dataset, feed
+from ..models import FeedEntry, Follow, Post, User, UserStats
+
+
+class DatasetTests(TestCase):
+
+    def test_generate_command_creates_requested_rows(self):
+        """Команда создает заданное число строк и пересчитывает счетчики."""
+        call_command(
+            'generate_dataset', users=30, groups=3, posts=200, comments=50,
+            follows=100, stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Follow.objects.count(), 100)
+        user = User.objects.annotate(total=Count('posts')).first()
+        self.assertEqual(user.stats.posts_count, user.total)
+
+    def test_follows_are_unique_and_skewed(self):
+        """Подписки не повторяются, а популярные авторы собирают
+        непропорционально много подписчиков."""
+        dataset.generate(
+            users=100, groups=2, posts=0, comments=0, follows=500,
+            derived=False,
+        )
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertEqual(
+            Follow.objects.values('user', 'author').distinct().count(), 500
+        )
+        top = Follow.objects.values('author').annotate(
+            total=Count('id')
+        ).order_by('-total').first()
+        self.assertGreater(top['total'], 500 / 100 * 3)
+
+    def test_second_run_appends(self):
+        """Повторный запуск с теми же prefix и seed дописывает данные."""
+        for _ in range(2):
+            dataset.generate(
+                users=10, groups=2, posts=20, comments=5, follows=10,
+                derived=False,
+            )
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 40)
+
+    @override_settings(FEED_BACKFILL_SIZE=3, FEED_FANOUT_LIMIT=5)
+    def test_feed_rebuild_is_one_statement(self):
+        """Пересборка лент — один INSERT ... SELECT: каждой подписке
+        достаются последние посты автора, кроме популярных авторов."""
+        dataset.generate(
+            users=30, groups=2, posts=300, comments=0, follows=120,
+            derived=False,
+        )
+        counters.recount()
+        # DELETE и INSERT; SAVEPOINT и RELEASE — от транзакции TestCase
+        with self.assertNumQueries(4):
+            feed.rebuild()
+        heavy = set(UserStats.objects.filter(
+            followers_count__gt=5
+        ).values_list('user_id', flat=True))
+        self.assertTrue(heavy)
+        expected = set()
+        for user_id, author_id in Follow.objects.values_list(
+            'user_id', 'author_id'
+        ):
+            if author_id not in heavy:
+                expected.update(
+                    (user_id, post_id)
+                    for post_id in Post.objects.filter(
+                        author_id=author_id
+                    ).order_by('-pub_date', '-id').values_list(
+                        'id', flat=True
+                    )[:3]
+                )
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('user_id', 'post_id')),
+            expected,
+        )
+
+    def test_dates_are_spread(self):
+        """Даты публикаций разбросаны, а не равны моменту вставки."""
+        dataset.generate(
+            users=5, groups=1, posts=50, comments=0, follows=0, days=30,
+            derived=False,
+        )
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1
+        )
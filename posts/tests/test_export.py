@@ -0,0 +1,89 @@
+import csv
+import json
+import os
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.another_user = User.objects.create_user(username='another_user')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост, "с" кавычками'
+        )
+        cls.another_post = Post.objects.create(
+            author=cls.another_user, text='Чужой пост'
+        )
+        cls.comment = Comment.objects.create(
+            author=cls.user, post=cls.another_post, text='Комментарий'
+        )
+        cls.EXPORT_URL = reverse('posts:profile_export', args=[cls.user])
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_jsonl_streams_posts_and_comments(self):
+        """Автор получает свои посты и комментарии построчно в JSON."""
+        response = self.author_client.get(self.EXPORT_URL)
+        self.assertIn('attachment', response['Content-Disposition'])
+        records = [
+            json.loads(line)
+            for line in self.content(response).splitlines()
+        ]
+        self.assertEqual(
+            [(record['type'], record['id']) for record in records],
+            [('post', self.post.id), ('comment', self.comment.id)],
+        )
+        self.assertEqual(records[0]['text'], self.post.text)
+        self.assertEqual(records[1]['post_id'], self.another_post.id)
+
+    def test_export_csv(self):
+        """CSV-выгрузка содержит заголовок и экранирует текст."""
+        response = self.author_client.get(self.EXPORT_URL, {'format': 'csv'})
+        rows = list(csv.DictReader(StringIO(self.content(response))))
+        self.assertEqual([row['type'] for row in rows], ['post', 'comment'])
+        self.assertEqual(rows[0]['text'], self.post.text)
+
+    def test_export_is_only_for_author(self):
+        """Чужую выгрузку получить нельзя, неизвестный формат — 404."""
+        client = Client()
+        client.force_login(self.another_user)
+        self.assertRedirects(
+            client.get(self.EXPORT_URL),
+            reverse('posts:profile', args=[self.user]),
+        )
+        self.assertEqual(
+            self.author_client.get(
+                self.EXPORT_URL, {'format': 'xml'}
+            ).status_code,
+            HTTPStatus.NOT_FOUND,
+        )
+
+    def test_export_command_writes_file_per_user(self):
+        """Команда выгружает всех пользователей с записями в файлы."""
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'export_content', output_dir=directory, stdout=StringIO()
+            )
+            self.assertEqual(
+                sorted(os.listdir(directory)),
+                ['another_user.jsonl', 'test_user.jsonl'],
+            )
+            with open(os.path.join(directory, 'test_user.jsonl')) as output:
+                self.assertEqual(len(output.readlines()), 2)
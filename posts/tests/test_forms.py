@@ -1,11 +1,13 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.forms import fields
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..forms import PostForm, CommentForm
 from ..models import Post, Group, User, Comment
@@ -147,7 +149,9 @@ class PostsFormsTests(TestCase):
         self.assertEqual(post.text, self.POST_DATA['text'])
         self.assertEqual(post.group.id, self.POST_DATA['group'])
         self.assertEqual(post.author, self.user)
-        self.assertEqual(post.image.read(), PICT_WHITE)
+        # прозрачная картинка перекодирована в WebP
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual(Image.open(post.image).size, (1, 1))
 
     def test_post_edit_updates_existing_post(self):
         """Валидная форма в EDIT_POST_URL изменяет запись в БД и переадресует
@@ -165,7 +169,13 @@ class PostsFormsTests(TestCase):
         self.assertEqual(updated_post.text, self.NEW_POST_DATA['text'])
         self.assertEqual(updated_post.group.id, self.NEW_POST_DATA['group'])
         self.assertEqual(updated_post.author, self.user)
-        self.assertEqual(updated_post.image.read(), PICT_BLACK)
+        self.assertTrue(updated_post.image.name.endswith('.jpg'))
+        pixel = Image.open(updated_post.image).convert('RGB').getpixel(
+            (0, 0)
+        )
+        for channel, expected in zip(pixel, (5, 4, 4)):
+            # JPEG сжимает с потерями
+            self.assertAlmostEqual(channel, expected, delta=3)
 
     def test_comment_post_saves_new_comment(self):
         """Валидная форма в COMMENT_POST_URL добавляет запись в БД и
@@ -182,3 +192,56 @@ class PostsFormsTests(TestCase):
         self.assertEqual(comment.text, self.COMMENT_DATA['text'])
         self.assertEqual(comment.post, self.COMMENT_DATA['post'])
         self.assertEqual(comment.author, self.another_user)
+
+    @override_settings(IMAGE_MAX_SIZE=200, IMAGE_VARIANTS=(50, 100, 400))
+    def test_uploaded_image_normalized_with_variants(self):
+        """Большая картинка уменьшается, теряет EXIF, рядом пишутся копии
+        меньших ширин, а страница поста выводит их в srcset."""
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        Image.new('RGB', (800, 400), 'red').save(
+            buffer, 'JPEG', exif=exif.tobytes()
+        )
+        upload = SimpleUploadedFile(
+            'photo.jpeg', buffer.getvalue(), content_type='image/jpeg'
+        )
+        self.authorized_client.post(
+            CREATE_POST_URL, data={'text': 'Фото', 'image': upload}
+        )
+        post = Post.objects.get(text='Фото')
+        image = Image.open(post.image)
+        self.assertEqual(image.size, (200, 100))
+        self.assertNotIn('exif', image.info)
+        self.assertEqual(post.image_width, 200)
+        variants = [
+            variant.rsplit(' ', 1)[0]
+            for variant in post.image_variants.split(', ')
+        ]
+        self.assertEqual([
+            Image.open(post.image.storage.open(name)).width
+            for name in variants
+        ], [50, 100])
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[post.id])
+        )
+        self.assertContains(response, f'{post.image.url} 200w')
+        self.assertContains(
+            response, f'{post.image.storage.url(variants[0])} 50w'
+        )
+
+    def test_truncated_image_rejected(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 400), 'red').save(buffer, 'JPEG')
+        upload = SimpleUploadedFile(
+            'broken.jpg', buffer.getvalue()[:800], content_type='image/jpeg'
+        )
+        response = self.authorized_client.post(
+            CREATE_POST_URL, data={'text': 'Битое фото', 'image': upload}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response, 'form', 'image',
+            'Не удалось прочитать изображение: файл поврежден.',
+        )
+        self.assertFalse(Post.objects.filter(text='Битое фото').exists())
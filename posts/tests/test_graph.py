@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tests.utils import on_commit_callbacks
+
+from .. import graph
+from ..models import Follow, User
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_following_ids_cached(self):
+        """Подписки читаются из БД один раз, дальше — из кэша."""
+        with self.assertNumQueries(1):
+            graph.following_ids(self.user.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                graph.following_ids(self.user.id), {self.author.id}
+            )
+            self.assertTrue(graph.is_following(self.user, self.author))
+            self.assertFalse(graph.is_following(self.user, self.other))
+
+    def test_follow_and_unfollow_update_graph(self):
+        graph.following_ids(self.user.id)
+        self.assertEqual(graph.follower_counts([self.other.id]), {
+            self.other.id: 0
+        })
+        client = Client()
+        client.force_login(self.user)
+        with on_commit_callbacks():
+            client.get(reverse('posts:profile_follow', args=['other']))
+        self.assertEqual(
+            graph.following_ids(self.user.id),
+            {self.author.id, self.other.id},
+        )
+        self.assertEqual(graph.follower_counts([self.other.id]), {
+            self.other.id: 1
+        })
+        with on_commit_callbacks():
+            client.get(reverse('posts:profile_unfollow', args=['author']))
+        self.assertEqual(graph.following_ids(self.user.id), {self.other.id})
+
+    def test_profile_check_skips_follow_table(self):
+        """Проверка «подписан ли я» на профиле не обращается к Follow."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:profile', args=['author'])
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertFalse([
+            query for query in queries
+            if Follow._meta.db_table in query['sql']
+        ])
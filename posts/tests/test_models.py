@@ -1,7 +1,10 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.db import models
 from django.test import TestCase
 
-from ..models import Group, Post, User, Comment
+from ..models import Group, Post, User, Comment, Follow, UserStats
 
 MODELS_FIELD_TYPES = {
     Post: {
@@ -102,3 +105,60 @@ class PostsModelTest(TestCase):
                         model._meta.get_field(field).verbose_name,
                         verbose
                     )
+
+
+class CountersTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='test_slug',
+            description='Описание',
+        )
+
+    def assertCounters(self):
+        post = Post.objects.get(pk=self.post.pk)
+        stats = UserStats.objects.get(user=self.user)
+        reader_stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(Group.objects.get().posts_count, 2)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(reader_stats.comments_count, 1)
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются при создании и удалении постов, комментариев
+        и подписок."""
+        self.post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group
+        )
+        Post.objects.create(author=self.user, text='Пост 2', group=self.group)
+        extra = Post.objects.create(author=self.user, text='Пост 3')
+        Comment.objects.create(text='Коммент', author=self.reader,
+                               post=self.post)
+        Follow.objects.create(user=self.reader, author=self.user)
+        extra.delete()
+        self.assertCounters()
+
+    def test_recount_repairs_counters(self):
+        """Команда recount_counters чинит рассинхронизированные счетчики."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Пост', group=self.group)
+            for _ in range(2)
+        )
+        self.post = Post.objects.first()
+        Comment.objects.bulk_create(
+            (Comment(text='Коммент', author=self.reader, post=self.post),)
+        )
+        Follow.objects.bulk_create(
+            (Follow(user=self.reader, author=self.user),)
+        )
+        UserStats.objects.all().delete()
+        call_command('recount_counters', stdout=StringIO())
+        self.assertCounters()
@@ -0,0 +1,114 @@
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import resolve, reverse
+
+from core.tests.utils import on_commit_callbacks
+
+from .. import graph
+from ..caching import VERSION_KEY, feed_version
+from ..models import Follow, Post, User
+from ..replicas import STICKY_COOKIE, ReplicaMiddleware
+
+INDEX_URL = reverse('posts:index')
+CREATE_URL = reverse('posts:post_create')
+
+
+class ReplicaRequestMixin:
+
+    def request(self, path, method='get', write=False, before=None,
+                **cookies):
+        """Прогоняет запрос через middleware и возвращает БД, выбранную
+        для чтения внутри view (после вызова before()), и ответ."""
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies)
+        request.resolver_match = resolve(path)
+        chosen = []
+
+        def view(request):
+            if write:
+                router.db_for_write(Post)
+            if before is not None:
+                before()
+            chosen.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        def get_response(request):
+            # так обработчик Django вызывает process_view перед view
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaMiddleware(get_response)
+        response = middleware(request)
+        return chosen[0], response
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(ReplicaRequestMixin, SimpleTestCase):
+
+    def test_feed_reads_go_to_replica(self):
+        """Чтение лент идет в реплику, а вне запроса — в основную БД."""
+        db, response = self.request(INDEX_URL)
+        self.assertEqual(db, 'replica')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_other_views_and_writes_use_primary(self):
+        """Прочие view и POST-запросы работают с основной БД и
+        закрепляют клиента за ней."""
+        db, _ = self.request(CREATE_URL)
+        self.assertEqual(db, DEFAULT_DB_ALIAS)
+        db, response = self.request(INDEX_URL, method='post')
+        self.assertEqual(db, DEFAULT_DB_ALIAS)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_fresh_feed_version_reads_primary(self):
+        """Ленту, измененную позже REPLICA_LAG_SEC назад, запрос читает из
+        основной БД, иначе — из реплики."""
+        cache.delete(VERSION_KEY.format('index'))
+        db, _ = self.request(INDEX_URL, before=lambda: feed_version('index'))
+        self.assertEqual(db, DEFAULT_DB_ALIAS)
+        cache.set(VERSION_KEY.format('index'), time.time_ns() - 10 ** 10)
+        db, _ = self.request(INDEX_URL, before=lambda: feed_version('index'))
+        self.assertEqual(db, 'replica')
+
+    def test_read_after_write_sticks_to_primary(self):
+        """После записи запрос и клиент читают из основной БД."""
+        db, response = self.request(INDEX_URL, write=True)
+        self.assertEqual(db, DEFAULT_DB_ALIAS)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        db, _ = self.request(INDEX_URL, **{STICKY_COOKIE: '1'})
+        self.assertEqual(db, DEFAULT_DB_ALIAS)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaGraphTests(ReplicaRequestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_graph_refilled_from_primary_after_follow(self):
+        """Граф подписок, сброшенный подпиской, перечитывается из основной
+        БД даже в запросе, читающем из реплики."""
+        graph.following_ids(self.user.id)
+        with on_commit_callbacks():
+            Follow.objects.create(user=self.user, author=self.author)
+        found = []
+        db, _ = self.request(INDEX_URL, before=lambda: found.append((
+            graph.following_ids(self.user.id),
+            graph.follower_counts([self.author.id]),
+        )))
+        self.assertEqual(db, 'replica')
+        self.assertEqual(
+            found, [({self.author.id}, {self.author.id: 1})]
+        )
@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+SEARCH_URL = reverse('posts:search')
+
+
+class PostsSearchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test_user')
+        cls.another_user = User.objects.create_user(username='another_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Описание'
+        )
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Коты и котики', group=cls.group,
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собаки лучше котов',
+        )
+        cls.another_cats = Post.objects.create(
+            author=cls.another_user, text='Мой кот спит',
+        )
+        cls.client = Client()
+
+    def search(self, **params):
+        return list(self.client.get(SEARCH_URL, params).context['page_obj'])
+
+    def test_search_finds_posts_by_word_prefix(self):
+        """Поиск находит посты по префиксу слова и не находит лишних."""
+        self.assertEqual(
+            set(self.search(q='кот')),
+            {self.cats, self.dogs, self.another_cats},
+        )
+        self.assertEqual(self.search(q='собаки'), [self.dogs])
+        self.assertEqual(self.search(q='кот собак'), [self.dogs])
+
+    def test_search_filters_by_group_and_author(self):
+        """Выдачу поиска можно ограничить группой и автором."""
+        self.assertEqual(
+            self.search(q='кот', group=self.group.slug), [self.cats]
+        )
+        self.assertEqual(
+            self.search(q='кот', author=self.another_user.username),
+            [self.another_cats],
+        )
+
+    def test_search_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.dogs.text = 'Попугаи'
+        self.dogs.save()
+        self.assertEqual(self.search(q='собаки'), [])
+        self.assertEqual(self.search(q='попугаи'), [self.dogs])
+        self.dogs.delete()
+        self.assertEqual(self.search(q='попугаи'), [])
+
+    def test_search_query_syntax_is_escaped(self):
+        """Спецсимволы FTS5 в запросе не ломают поиск."""
+        for query in ('"', 'кот OR', 'NEAR(', '*', '-кот'):
+            with self.subTest(query=query):
+                response = self.client.get(SEARCH_URL, {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_rebuild_restores_bulk_created_posts(self):
+        """Посты из bulk_create попадают в индекс после перестройки."""
+        Post.objects.bulk_create(
+            (Post(author=self.user, text='Хомяки'),)
+        )
+        self.assertEqual(self.search(q='хомяки'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search(q='хомяки')), 1)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через полнотекстовый индекс."""
+        request = RequestFactory().get('/')
+        queryset, _ = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'собак'
+        )
+        self.assertEqual(list(queryset), [self.dogs])
@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TransactionTestCase, override_settings
+
+from .. import thumbnails
+from ..models import MediaFile, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+PICT = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x80\x00\x00\x05\x04\x04'
+    b'\x00\x00\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02\x44'
+    b'\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='uploader')
+
+    def create_post(self, name):
+        post = Post(author=self.user, text='Мем')
+        post.image.save(name, ContentFile(PICT), save=False)
+        post.save()
+        return post
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковые байты под разными именами — один файл, на который
+        ссылаются оба поста; файл удаляется вместе с последней ссылкой."""
+        first = self.create_post('meme.GIF')
+        second = self.create_post('copy.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
+        )
+        self.assertEqual(MediaFile.objects.get(name=first.image.name).refs, 2)
+        storage = first.image.storage
+        first.delete()
+        self.assertTrue(storage.exists(second.image.name))
+        second.delete()
+        self.assertFalse(storage.exists(second.image.name))
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_replaced_image_released(self):
+        post = self.create_post('meme.gif')
+        old_name = post.image.name
+        post.image.save('other.gif', ContentFile(PICT + b'\0'), save=True)
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(post.image.storage.exists(old_name))
+        self.assertEqual(
+            list(MediaFile.objects.values_list('name', 'refs')),
+            [(post.image.name, 1)],
+        )
+
+    def test_worker_thumbnail_found_by_feed_lookup(self):
+        """Миниатюра из воркера лежит под тем же ключом sorl, что ищут
+        cached_thumbnail и prefetch_thumbnails."""
+        executor = mock.Mock()
+        executor.submit.side_effect = lambda func, *args: func(*args)
+        post = self.create_post('meme.gif')
+        geometry, options = settings.THUMBNAIL_SIZES['feed']
+        self.assertIsNone(
+            thumbnails.cached_thumbnail(post.image, geometry, **options)
+        )
+        with mock.patch.object(
+            thumbnails, '_get_executor', return_value=executor
+        ):
+            thumbnails.queue_thumbnails(post.image)
+        self.assertEqual(executor.submit.call_count, 1)
+        self.assertIsNotNone(
+            thumbnails.cached_thumbnail(post.image, geometry, **options)
+        )
+        thumbnails.prefetch_thumbnails([post], 'feed')
+        self.assertIsNotNone(post.thumbnails['feed'])
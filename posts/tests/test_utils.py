@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+from ..utils import CursorPaginator, encode_cursor
+
+PER_PAGE = 4
+POSTS_NUM = 13
+
+
+class CursorPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Post {n}', group=cls.group)
+            for n in range(POSTS_NUM)
+        )
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+        cls.GROUP_URL = reverse('posts:group_list', args=[cls.group.slug])
+
+    def walk_forward(self):
+        paginator = CursorPaginator(Post.objects.all(), PER_PAGE)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return paginator, pages
+
+    def test_forward_walk_returns_all_posts_in_order(self):
+        """Переход по next_cursor выдает все посты по убыванию без
+        повторов и пропусков."""
+        _, pages = self.walk_forward()
+        self.assertEqual(
+            [post for page in pages for post in page],
+            self.expected,
+        )
+        self.assertFalse(pages[0].has_previous())
+        self.assertEqual(len(pages[-1]), POSTS_NUM % PER_PAGE)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """previous_cursor возвращает ровно предыдущую страницу."""
+        paginator, pages = self.walk_forward()
+        for number in range(1, len(pages)):
+            with self.subTest(page=number):
+                previous = paginator.get_page(pages[number].previous_cursor)
+                self.assertEqual(
+                    list(previous),
+                    list(pages[number - 1]),
+                )
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Испорченный курсор возвращает первую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), PER_PAGE)
+        for cursor in (
+            'garbage', 'W10', 'WyJuIiwgWzEsIDJdXQ',
+            encode_cursor('n', [None, None]),
+            encode_cursor('p', [None, self.expected[5].id]),
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(
+                    list(paginator.get_page(cursor)),
+                    self.expected[:PER_PAGE],
+                )
+
+    def test_page_is_fetched_on_first_use(self):
+        """Как Page у Paginator, страница читает строки лениво и один раз."""
+        paginator = CursorPaginator(Post.objects.all(), PER_PAGE)
+        with self.assertNumQueries(0):
+            page = paginator.get_page(None)
+        with self.assertNumQueries(1):
+            self.assertEqual(list(page), self.expected[:PER_PAGE])
+            self.assertTrue(page.has_next())
+
+    @override_settings(CURSOR_PAGINATION=True)
+    def test_feed_view_uses_cursor_pages(self):
+        """Лента в режиме CURSOR_PAGINATION листается по ?cursor=."""
+        client = Client()
+        page_obj = client.get(self.GROUP_URL).context['page_obj']
+        self.assertTrue(page_obj.is_cursor)
+        second = client.get(
+            self.GROUP_URL, {'cursor': page_obj.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(second), self.expected[10:20])
+
+
+@override_settings(CURSOR_PAGINATION=False)
+class CountedPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(POSTS_NUM):
+            Post.objects.create(
+                author=cls.author, text=f'Post {number}', group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get_page(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            page_obj = self.client.get(url, {'page': 2}).context['page_obj']
+        counts = [
+            query['sql'] for query in queries if 'COUNT(' in query['sql']
+        ]
+        return page_obj, counts
+
+    def test_pages_use_stored_post_counts(self):
+        """Страницы группы и профиля берут число постов из счетчиков,
+        главная и подписки считают его один раз на версию ленты."""
+        urls = (
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:index'),
+            reverse('posts:follow_index'),
+        )
+        for url in urls[2:]:
+            self.get_page(url)
+        for url in urls:
+            with self.subTest(url=url):
+                page_obj, counts = self.get_page(url)
+                self.assertEqual(counts, [])
+                self.assertEqual(page_obj.paginator.count, POSTS_NUM)
+                self.assertEqual(page_obj.number, 2)
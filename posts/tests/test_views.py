@@ -4,11 +4,20 @@ import tempfile
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
 
+from core.tests.utils import on_commit_callbacks
+
+from .. import counters
+from ..caching import feed_version, post_feeds
 from ..forms import PostForm
-from ..models import Post, Group, User, Comment, Follow
+from ..fragments import render_posts
+from ..models import Post, Group, User, Comment, FeedEntry, Follow
+from ..thumbnails import prefetch_thumbnails
 
 INDEX_URL = reverse('posts:index')
 FOLLOW_INDEX_URL = reverse('posts:follow_index')
@@ -68,6 +77,8 @@ class PostsViewTests(TestCase):
             for n in range(1, settings.POSTS_PER_PAGE + 1)
         ]
         Post.objects.bulk_create(post_list)
+        # bulk_create не шлет сигналов, пагинации нужны счетчики постов
+        counters.recount()
         cls.post_11 = cls.another_post = Post.objects.create(
             author=cls.another_user, text='Post 11', group=None,
         )
@@ -84,6 +95,9 @@ class PostsViewTests(TestCase):
             post=cls.post,
         )
 
+        # счетчики обновляются в БД сигналами, фикстуры нужно перечитать
+        cls.group.refresh_from_db()
+        cls.post.refresh_from_db()
         cls.post_form = PostForm(instance=cls.post)
 
         cls.POST_DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
@@ -129,6 +143,9 @@ class PostsViewTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        cache.clear()
+
     @staticmethod
     def context_eq_fixture(context, fixture):
         flag = True
@@ -167,6 +184,28 @@ class PostsViewTests(TestCase):
         comment = response.context['comments'][0]
         self.assertTrue(self.context_eq_fixture(comment, self.comment))
 
+    def test_post_detail_comments_are_paginated(self):
+        """Комментарии в POST_DETAIL выводятся страницами с авторами в
+        одном запросе, следующая страница отдается фрагментом."""
+        Comment.objects.bulk_create(
+            Comment(text=f'Коммент {n}', author=self.another_user,
+                    post=self.post)
+            for n in range(settings.COMMENTS_PER_PAGE)
+        )
+        response = self.auth_client.get(self.POST_DETAIL_URL)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_PER_PAGE)
+        self.assertTrue(comments.has_next())
+        with self.assertNumQueries(0):
+            [comment.author.username for comment in comments]
+        response = self.auth_client.get(
+            reverse('posts:post_comments', args=[self.post.id]),
+            {'cursor': comments.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comment_feed.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(list(response.context['comments']), [self.comment])
+
     def test_post_lists_contain_pages(self):
         """На страницах со списком постов записи выводятся страницы.
         На главной больше на 1 запись."""
@@ -195,6 +234,55 @@ class PostsViewTests(TestCase):
                 else:
                     self.assertNotIn(self.another_post, posts_list)
 
+    def test_thumbnail_placeholder_until_generated(self):
+        """Пока миниатюра не создана воркером, выводится заглушка; ресайз
+        в запросе не выполняется."""
+        self.assertContains(
+            self.auth_client.get(self.POST_DETAIL_URL), 'placeholder.svg'
+        )
+        geometry, options = settings.THUMBNAIL_SIZES['feed']
+        thumbnail = get_thumbnail(self.post.image, geometry, **options)
+        response = self.auth_client.get(self.POST_DETAIL_URL)
+        self.assertNotContains(response, 'placeholder.svg')
+        self.assertContains(response, thumbnail.url)
+
+    def test_thumbnails_prefetched_in_one_lookup(self):
+        """Миниатюры всей страницы разрешаются одним запросом к БД, а при
+        повторе берутся из кэша без запросов."""
+        geometry, options = settings.THUMBNAIL_SIZES['feed']
+        thumbnail = get_thumbnail(self.post.image, geometry, **options)
+        Post.objects.create(
+            author=self.user, text='Без миниатюры', image=UPLOAD_PICT_BLACK,
+        )
+        cache.clear()
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            prefetch_thumbnails(posts, 'feed')
+        for post in posts:
+            with self.subTest(post=post):
+                if post == self.post:
+                    self.assertEqual(
+                        post.thumbnails['feed'].url, thumbnail.url
+                    )
+                else:
+                    self.assertIsNone(post.thumbnails['feed'])
+        with self.assertNumQueries(0):
+            prefetch_thumbnails(posts, 'feed')
+
+    def test_post_fragments_reused_until_post_updated(self):
+        """HTML поста рендерится один раз и берется из кэша, пока пост
+        не изменен; правка меняет только его фрагмент."""
+        posts = list(Post.objects.all()[:2])
+        first = render_posts(posts, True)
+        for post in posts:
+            post.text = 'Изменено в обход save'
+        self.assertEqual(render_posts(posts, True), first)
+        self.assertNotEqual(render_posts(posts, False), first)
+        posts[0].save()
+        second = render_posts(posts, True)
+        self.assertIn('Изменено в обход save', second[0])
+        self.assertEqual(second[1], first[1])
+
     def test_post_create_passes_empty_post_form(self):
         """В CREATE_POST в шаблон передается пустой объект PostForm."""
         context = self.auth_client.get(CREATE_POST_URL).context['form']
@@ -207,15 +295,115 @@ class PostsViewTests(TestCase):
         self.assertIsInstance(context, PostForm)
         self.assertTrue(self.form_data_eq_fixture(context, self.post_form))
 
-    def test_index_page_is_cached(self):
-        """Страница INDEX кэшируется."""
-        page_before = self.auth_client.get(INDEX_URL)
-        Post.objects.all().delete()
-        page_cached = self.auth_client.get(INDEX_URL)
-        self.assertEqual(page_before.content, page_cached.content)
-        cache.clear()
-        page_empty = self.auth_client.get(INDEX_URL)
-        self.assertNotEqual(page_empty.content, page_cached.content)
+    def test_feed_pages_are_cached(self):
+        """Страницы с лентами кэшируются: изменение в обход сигналов
+        не видно до очистки кэша."""
+        Follow.objects.create(user=self.user, author=self.another_user)
+        for page in (*POST_PAGES_URLS, FOLLOW_INDEX_URL):
+            with self.subTest(page=page):
+                page_before = self.auth_client.get(page)
+                Post.objects.update(text='Обновленный текст')
+                page_cached = self.auth_client.get(page)
+                self.assertEqual(page_before.content, page_cached.content)
+                cache.clear()
+                page_fresh = self.auth_client.get(page)
+                self.assertNotEqual(page_fresh.content, page_cached.content)
+                Post.objects.update(text='Post')
+
+    def test_feed_cache_is_page_aware(self):
+        """Вторая страница не отдается из кэша первой."""
+        for page in POST_PAGES_URLS:
+            with self.subTest(page=page):
+                first = self.auth_client.get(page)
+                second = self.auth_client.get(page + '?page=2')
+                self.assertNotEqual(first.content, second.content)
+
+    def test_post_changes_invalidate_feed_cache(self):
+        """Создание, редактирование и удаление поста сбрасывают кэш лент."""
+        self.auth_client.get(INDEX_URL)
+        with on_commit_callbacks():
+            self.auth_client.post(CREATE_POST_URL, data={'text': 'Свежий'})
+        self.assertContains(self.auth_client.get(INDEX_URL), 'Свежий')
+        with on_commit_callbacks():
+            self.auth_client.post(
+                self.EDIT_POST_URL, data={'text': 'Правка'}
+            )
+        self.assertContains(self.auth_client.get(GROUP_URL), 'Post 10')
+        self.assertNotContains(self.auth_client.get(GROUP_URL), LAST_POST)
+        with on_commit_callbacks():
+            Post.objects.get(text='Свежий').delete()
+        self.assertNotContains(self.auth_client.get(INDEX_URL), 'Свежий')
+
+    def test_feed_version_changes_after_commit(self):
+        """Версия ленты меняется только после коммита записи."""
+        version = feed_version('index')
+        with on_commit_callbacks():
+            Post.objects.create(author=self.user, text='Новый')
+            self.assertEqual(feed_version('index'), version)
+        self.assertNotEqual(feed_version('index'), version)
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Повторный запрос с ETag неизмененной страницы получает 304 без
+        рендера, а после изменения — страницу целиком."""
+        for page in (*POST_PAGES_URLS, self.POST_DETAIL_URL):
+            with self.subTest(page=page):
+                etag = self.auth_client.get(page)['ETag']
+                response = self.auth_client.get(page, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                with on_commit_callbacks():
+                    Post.objects.create(
+                        author=self.user, text='Новый', group=self.group
+                    )
+                    Comment.objects.create(
+                        author=self.user, post=self.post, text='Новый'
+                    )
+                response = self.auth_client.get(page, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_etag_follows_comments(self):
+        """ETag поста считается одним запросом без JOIN по комментариям и
+        меняется, даже если число комментариев осталось прежним."""
+        client = Client()
+        etag = client.get(self.POST_DETAIL_URL)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        with on_commit_callbacks():
+            self.comment.delete()
+            Comment.objects.create(
+                author=self.user, post=self.post, text='Замена'
+            )
+        response = client.get(self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer_and_query(self):
+        """ETag различается для разных зрителей, страниц и подписок."""
+        etag = self.auth_client.get(INDEX_URL)['ETag']
+        self.assertNotEqual(etag, self.another_auth_client.get(
+            INDEX_URL
+        )['ETag'])
+        self.assertNotEqual(etag, self.auth_client.get(
+            INDEX_URL, {'page': 2}
+        )['ETag'])
+        etag = self.another_auth_client.get(USER_PROFILE_URL)['ETag']
+        self.another_auth_client.get(self.FOLLOW_USER_URL)
+        self.assertNotEqual(etag, self.another_auth_client.get(
+            USER_PROFILE_URL
+        )['ETag'])
+
+    def test_not_modified_costs_no_render(self):
+        """Ответ 304 на главной не рендерит шаблон и не ходит в БД."""
+        client = Client()
+        etag = client.get(INDEX_URL)['ETag']
+        with self.assertNumQueries(0):
+            response = client.get(INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
 
     def test_follow(self):
         """Another_user может подписаться на user."""
@@ -245,6 +433,46 @@ class PostsViewTests(TestCase):
         another_post = response.context['page_obj'][0]
         self.assertTrue(self.context_eq_fixture(another_post, self.post_11))
 
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост автора попадает в материализованную ленту
+        подписчика, а отписка удаляет записи автора из ленты."""
+        self.another_auth_client.get(self.FOLLOW_USER_URL)
+        self.auth_client.post(CREATE_POST_URL, data={'text': 'Свежий'})
+        new_post = Post.objects.get(text='Свежий')
+        response = self.another_auth_client.get(FOLLOW_INDEX_URL)
+        self.assertEqual(response.context['page_obj'][0], new_post)
+        self.another_auth_client.get(self.UNFOLLOW_USER_URL)
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.another_user).exists()
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_heavy_author_posts_pulled_on_read(self):
+        """Посты авторов сверх FEED_FANOUT_LIMIT не раздаются при записи,
+        но появляются в ленте при чтении."""
+        Follow.objects.create(user=self.another_user, author=self.user)
+        FeedEntry.objects.all().delete()
+        self.auth_client.post(CREATE_POST_URL, data={'text': 'Свежий'})
+        self.assertFalse(FeedEntry.objects.exists())
+        response = self.another_auth_client.get(FOLLOW_INDEX_URL)
+        self.assertEqual(response.context['page_obj'][0].text, 'Свежий')
+        # правка меняет версию автора, а не ленты каждого подписчика
+        post = Post.objects.get(text='Свежий')
+        self.assertNotIn(
+            f'follow:{self.another_user.id}', post_feeds(post)
+        )
+        with on_commit_callbacks():
+            self.auth_client.post(
+                reverse('posts:post_edit', args=[post.id]),
+                data={'text': 'Исправленный'},
+            )
+        # чтение сверяет версию автора; вне TestCase хук сработал бы сразу
+        with on_commit_callbacks():
+            self.another_auth_client.get(FOLLOW_INDEX_URL)
+        self.assertContains(
+            self.another_auth_client.get(FOLLOW_INDEX_URL), 'Исправленный'
+        )
+
     def test_cannot_self_follow(self):
         """Нельзя подписаться на себя и работает ограничение в модели."""
         followings = set(Follow.objects.all())
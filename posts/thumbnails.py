@@ -0,0 +1,149 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .caching import invalidate, post_feeds
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _options(source, options):
+    """Дополняет опции так же, как ThumbnailBackend.get_thumbnail, чтобы
+    имя миниатюры совпало с тем, что создаст воркер."""
+    options = dict(options)
+    backend = default.backend
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """KV-хранилище sorl (кэш + БД) с пакетным чтением."""
+
+    def get_many(self, image_files):
+        """Читает записи одним get_many из кэша и одним запросом к БД для
+        промахов. Возвращает {key: ImageFile или None}."""
+        keys = {add_prefix(image_file.key): image_file.key
+                for image_file in image_files}
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            rows = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            fetched = {
+                key: rows.get(key, cached_db_kvstore.EMPTY_VALUE)
+                for key in missing
+            }
+            self.cache.set_many(
+                fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+            values.update(fetched)
+        return {
+            short_key: (
+                None if values[key] == cached_db_kvstore.EMPTY_VALUE
+                else deserialize_image_file(values[key])
+            )
+            for key, short_key in keys.items()
+        }
+
+
+def _thumbnail_file(file_, geometry, options):
+    source = ImageFile(file_)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, _options(source, options)
+    )
+    return ImageFile(name, default.storage)
+
+
+def cached_thumbnail(file_, geometry, **options):
+    """Готовая миниатюра из KV-хранилища sorl или None — без ресайза."""
+    return default.kvstore.get(_thumbnail_file(file_, geometry, options))
+
+
+def prefetch_thumbnails(posts, size):
+    """Разрешает миниатюры всех постов страницы одним пакетным чтением и
+    кладет их в post.thumbnails[size]; недостающие ставит в очередь."""
+    geometry, options = settings.THUMBNAIL_SIZES[size]
+    files = {
+        post: _thumbnail_file(post.image, geometry, options)
+        for post in posts if post.image
+    }
+    found = default.kvstore.get_many(files.values())
+    for post in posts:
+        if not hasattr(post, 'thumbnails'):
+            post.thumbnails = {}
+        thumbnail = found.get(files[post].key) if post in files else None
+        post.thumbnails[size] = thumbnail
+        if post.image and thumbnail is None:
+            queue_thumbnails(post.image, ((geometry, options),))
+
+
+def _generate(name, storage, sizes, post):
+    try:
+        # хранилище поля входит в ключ sorl: с голым именем источник
+        # читался бы через default_storage, и миниатюра легла бы под
+        # другим ключом, чем ищут cached_thumbnail и prefetch_thumbnails
+        source = ImageFile(name, storage)
+        for geometry, options in sizes:
+            get_thumbnail(source, geometry, **dict(options))
+        # в закэшированных фрагментах лент вместо миниатюры стоит заглушка
+        invalidate(*post_feeds(post))
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with _pending_lock:
+            _pending.discard((name, sizes))
+        connection.close()
+
+
+def _submit(name, storage, sizes, post):
+    with _pending_lock:
+        if (name, sizes) in _pending:
+            return
+        _pending.add((name, sizes))
+    _get_executor().submit(_generate, name, storage, sizes, post)
+
+
+def queue_thumbnails(image, sizes=None):
+    """Ставит генерацию миниатюр в очередь фонового пула после коммита."""
+    if not image:
+        return
+    if sizes is None:
+        sizes = settings.THUMBNAIL_SIZES.values()
+    sizes = tuple(
+        (geometry, tuple(sorted(options.items())))
+        for geometry, options in sizes
+    )
+    name, storage, post = image.name, image.storage, image.instance
+    transaction.on_commit(lambda: _submit(name, storage, sizes, post))
@@ -1,9 +1,247 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+POST_ORDERING = ('-pub_date', '-id')
+COMMENT_ORDERING = ('-created', '-id')
+SEARCH_ORDERING = ('rank', '-id')
+
+
+def encode_cursor(direction, values):
+    # DjangoJSONEncoder обрезает микросекунды, а ключу нужна полная точность
+    values = [
+        value.isoformat() if hasattr(value, 'isoformat') else value
+        for value in values
+    ]
+    raw = json.dumps([direction, values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        direction, values = json.loads(
+            base64.urlsafe_b64decode(cursor + padding).decode()
+        )
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if direction not in ('n', 'p') or not isinstance(values, list):
+        return None
+    return direction, values
+
+
+class CursorPage:
+    """Страница keyset-пагинации: без номера страницы и общего количества.
+
+    Как и Page у Paginator, строки выбираются при первом обращении к
+    странице, поэтому фрагмент {% cache %} экономит и запрос ленты.
+    """
+
+    is_cursor = True
+
+    def __init__(self, load):
+        # load() -> (строки, next_cursor, previous_cursor)
+        self._load = load
+        self._result = None
+
+    def _resolve(self):
+        if self._result is None:
+            self._result = self._load()
+        return self._result
+
+    @property
+    def object_list(self):
+        return self._resolve()[0]
+
+    @object_list.setter
+    def object_list(self, rows):
+        _, next_cursor, previous_cursor = self._resolve()
+        self._result = rows, next_cursor, previous_cursor
+
+    @property
+    def next_cursor(self):
+        return self._resolve()[1]
+
+    @property
+    def previous_cursor(self):
+        return self._resolve()[2]
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __contains__(self, item):
+        return item in self.object_list
 
+    def has_next(self):
+        return self.next_cursor is not None
 
-def make_pages(request, post_list, posts_num=settings.POSTS_PER_PAGE):
-    paginator = Paginator(post_list, posts_num)
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по упорядоченному набору полей.
+
+    Вместо OFFSET и COUNT(*) каждая страница выбирается условием
+    «строго после/до ключа крайней записи», поэтому время выборки не
+    зависит от глубины страницы. Последнее поле ordering должно быть
+    уникальным (обычно id).
+    """
+
+    def __init__(self, object_list, per_page, ordering=POST_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+
+    def _key(self, obj):
+        # строки .values() приходят словарями
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def _field(self, name):
+        annotations = self.object_list.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def _parse_values(self, values):
+        if len(values) != len(self.fields):
+            raise ValueError
+        values = [
+            self._field(field).to_python(value)
+            for field, value in zip(self.fields, values)
+        ]
+        # null из JSON нельзя сравнивать в условии _seek
+        if None in values:
+            raise ValueError
+        return values
+
+    def _seek(self, values, forward):
+        condition = Q()
+        for position, ordering in enumerate(self.ordering):
+            lookup = 'lt' if ordering.startswith('-') == forward else 'gt'
+            field = self.fields[position]
+            step = Q(**{f'{field}__{lookup}': values[position]})
+            for prefix_field, value in zip(self.fields[:position], values):
+                step &= Q(**{prefix_field: value})
+            condition |= step
+        return condition
+
+    @staticmethod
+    def _reversed(ordering):
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in ordering
+        )
+
+    def get_page(self, cursor=None):
+        decoded = decode_cursor(cursor) if cursor else None
+        values = None
+        if decoded is not None:
+            direction, raw_values = decoded
+            try:
+                values = self._parse_values(raw_values)
+            except (ValueError, TypeError, ValidationError):
+                values = None
+        if values is None:
+            return CursorPage(lambda: self._page_after(None))
+        if direction == 'p':
+            return CursorPage(lambda: self._page_before(values))
+        return CursorPage(lambda: self._page_after(values))
+
+    def _page_after(self, values):
+        queryset = self.object_list.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward=True))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        next_cursor = (
+            encode_cursor('n', self._key(rows[-1])) if has_more else None
+        )
+        previous_cursor = (
+            encode_cursor('p', self._key(rows[0]))
+            if values is not None and rows else None
+        )
+        return rows, next_cursor, previous_cursor
+
+    def _page_before(self, values):
+        queryset = self.object_list.order_by(
+            *self._reversed(self.ordering)
+        ).filter(self._seek(values, forward=False))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not rows:
+            return self._page_after(None)
+        previous_cursor = (
+            encode_cursor('p', self._key(rows[0])) if has_more else None
+        )
+        next_cursor = encode_cursor('n', self._key(rows[-1]))
+        return rows, next_cursor, previous_cursor
+
+
+class CountedPaginator(Paginator):
+    """Paginator с известным числом объектов: вместо COUNT(*) берется
+    счетчик. count — число или функция без аргументов."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        if callable(self._known_count):
+            return self._known_count()
+        return self._known_count
+
+
+def make_pages(request, post_list, posts_num=settings.POSTS_PER_PAGE,
+               cursor=None, count=None):
+    if cursor is None:
+        cursor = settings.CURSOR_PAGINATION
+    if cursor:
+        return CursorPaginator(post_list, posts_num).get_page(
+            request.GET.get('cursor')
+        )
+    if count is None:
+        paginator = Paginator(post_list, posts_num)
+    else:
+        paginator = CountedPaginator(post_list, posts_num, count)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def make_search_pages(request, post_list,
+                      posts_num=settings.POSTS_PER_PAGE):
+    return CursorPaginator(
+        post_list, posts_num, ordering=SEARCH_ORDERING
+    ).get_page(request.GET.get('cursor'))
+
+
+def make_comment_pages(request, comment_list,
+                       comments_num=settings.COMMENTS_PER_PAGE):
+    return CursorPaginator(
+        comment_list, comments_num, ordering=COMMENT_ORDERING
+    ).get_page(request.GET.get('cursor'))
@@ -1,44 +1,112 @@
+from functools import partial
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 
+from core.db import retry_on_locked
+from core.ratelimit import rate_limit
+
+from . import api, export, graph
+from .caching import (
+    conditional, feed_cache, feed_count, group_etag, index_etag, post_etag,
+    profile_etag,
+)
+from .feed import follow_feed
 from .forms import PostForm, CommentForm
 from .models import Post, Group, User, Comment, Follow
-from .utils import make_pages
+from .search import search_posts
+from .thumbnails import queue_thumbnails
+from .utils import make_comment_pages, make_pages, make_search_pages
 
 
+@conditional(index_etag)
 def index(request):
     return render(request, 'posts/index.html', {
         'page_obj': make_pages(
             request,
             Post.objects.select_related('author', 'group'),
+            count=partial(feed_count, 'index', Post.objects.all()),
         ),
         'index': True,
         'follow': False,
         'get_author': True,
+        **feed_cache(request, 'index'),
     })
 
 
+@conditional(group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     return render(request, 'posts/group_list.html', {
         'group': group,
         'page_obj': make_pages(
             request,
-            group.posts.select_related('author', 'group')
+            group.posts.select_related('author', 'group'),
+            count=group.posts_count,
         ),
         'get_author': True,
+        **feed_cache(request, f'group:{group.id}'),
     })
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    post_list = Post.objects.select_related('author', 'group')
+    group_slug = request.GET.get('group')
+    if group_slug:
+        post_list = post_list.filter(group__slug=group_slug)
+    username = request.GET.get('author')
+    if username:
+        post_list = post_list.filter(author__username=username)
+    filters = {
+        name: value for name, value in (
+            ('q', query), ('group', group_slug), ('author', username)
+        ) if value
+    }
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'group_slug': group_slug or '',
+        'author_name': username or '',
+        'groups': Group.objects.all(),
+        'page_obj': make_search_pages(
+            request, search_posts(query, post_list)
+        ),
+        'page_query': f'{urlencode(filters)}&' if filters else '',
+        'get_author': True,
+    })
+
+
+@conditional(post_etag)
 def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', {
-        'post': Post.objects.select_related('author', 'group').get(id=post_id),
-        'comments': Comment.objects.filter(post=post_id),
+        'post': Post.objects.select_related(
+            'author__stats', 'group'
+        ).get(id=post_id),
+        'comments': make_comment_pages(
+            request,
+            Comment.objects.filter(post=post_id).select_related('author'),
+        ),
         'form': CommentForm(request.POST or None),
     })
 
 
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    return render(request, 'posts/includes/comment_feed.html', {
+        'post': post,
+        'comments': make_comment_pages(
+            request,
+            post.comments.select_related('author'),
+        ),
+    })
+
+
 @login_required
+@rate_limit('post_create')
+@retry_on_locked
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
@@ -49,10 +117,12 @@ def post_create(request):
     new_post = form.save(commit=False)
     new_post.author = request.user
     new_post.save()
+    queue_thumbnails(new_post.image)
     return redirect('posts:profile', new_post.author.username)
 
 
 @login_required()
+@retry_on_locked
 def post_edit(request, post_id):
     instance = get_object_or_404(Post, id=post_id)
     if instance.author == request.user:
@@ -69,10 +139,14 @@ def post_edit(request, post_id):
         edited_post = form.save(commit=False)
         edited_post.author = request.user
         edited_post.save()
+        if 'image' in form.changed_data:
+            queue_thumbnails(edited_post.image)
     return redirect('posts:post_detail', post_id)
 
 
 @login_required()
+@rate_limit('add_comment')
+@retry_on_locked
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     post = get_object_or_404(Post, id=post_id)
@@ -84,25 +158,46 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id)
 
 
+@conditional(profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = (
-        request.user.is_authenticated
-        and (request.user != author)
-        and Follow.objects.filter(user=request.user, author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
     )
+    following = graph.is_following(request.user, author)
     return render(request, 'posts/profile.html', {
         'author': author,
         'page_obj': make_pages(
             request,
-            author.posts.select_related('author', 'group')
+            author.posts.select_related('author', 'group'),
+            count=author.stats.posts_count,
         ),
         'following': following,
         'get_author': False,
+        **feed_cache(request, f'profile:{author.id}'),
     })
 
 
 @login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        return redirect('posts:profile', username)
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in export.FORMATS:
+        raise Http404
+    response = StreamingHttpResponse(
+        export.stream(author, export_format),
+        content_type=export.FORMATS[export_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{username}.{export_format}"'
+    )
+    return response
+
+
+@login_required
+@rate_limit('profile_follow', methods=None)
+@retry_on_locked
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -111,6 +206,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_locked
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     unfollow = get_object_or_404(
@@ -127,12 +223,63 @@ def profile_unfollow(request, username):
 
 @login_required()
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = make_pages(request, post_list)
+    feed = f'follow:{request.user.id}'
+    entries = follow_feed(request.user)
+    page_obj = make_pages(
+        request, entries, count=partial(feed_count, feed, entries)
+    )
+    page_obj.object_list = [entry.post for entry in page_obj]
     context = {
         'page_obj': page_obj,
         'index': False,
         'follow': True,
         'get_author': True,
+        **feed_cache(request, feed),
     }
     return render(request, 'posts/follow.html', context)
+
+
+@conditional(index_etag, cache_sec=settings.API_CACHE_SEC)
+@api.api_view
+def api_index(request):
+    return api.page(request, Post.objects.all(), api.POST_FIELDS)
+
+
+@conditional(group_etag, cache_sec=settings.API_CACHE_SEC)
+@api.api_view
+def api_group(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        raise api.ApiError('Группа не найдена', status=404)
+    return api.page(
+        request, Post.objects.filter(group_id=group_id), api.POST_FIELDS
+    )
+
+
+@conditional(profile_etag, cache_sec=settings.API_CACHE_SEC)
+@api.api_view
+def api_profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if author_id is None:
+        raise api.ApiError('Автор не найден', status=404)
+    return api.page(
+        request, Post.objects.filter(author_id=author_id), api.POST_FIELDS
+    )
+
+
+@conditional(post_etag, cache_sec=settings.API_CACHE_SEC)
+@api.api_view
+def api_post(request, post_id):
+    return api.post_detail(request, post_id)
+
+
+@conditional(api.follow_etag, cache_sec=settings.API_CACHE_SEC)
+@api.api_view
+def api_follow(request):
+    if not request.user.is_authenticated:
+        raise api.ApiError('Требуется авторизация', status=401)
+    return api.follow_page(request)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 DEBUG = True
 
@@ -6,27 +7,115 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Кэширование статики, которую отдает core.staticfiles.StaticFilesApplication:
+# файлы с хэшем в имени не меняются, остальные перепроверяются
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_MAX_AGE = 60
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
 POSTS_PER_PAGE = 10
-
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+COMMENTS_PER_PAGE = 20
+# Keyset-пагинация лент по (pub_date, id) вместо OFFSET/COUNT(*)
+CURSOR_PAGINATION = False
+# Материализованная лента подписок: авторы с большим числом подписчиков
+# не раздаются при записи, а подтягиваются при чтении
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_SIZE = 1000
+# Подписки пользователя и число подписчиков авторов в кэше; подписка и
+# отписка сбрасывают их сразу, срок — страховка от правок в обход ORM
+FOLLOW_GRAPH_SEC = 60 * 60
+# Выгрузка записей автора читает БД пачками такого размера
+EXPORT_CHUNK_SIZE = 2000
+# Размер страницы JSON API по умолчанию и предел для ?limit=
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+# Письма ставятся в очередь в БД, отправляет их send_spooled_email
+# через EMAIL_SPOOL_BACKEND
+EMAIL_BACKEND = 'core.mail.SpoolEmailBackend'
+EMAIL_SPOOL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+EMAIL_SPOOL_BATCH_SIZE = 100
+EMAIL_SPOOL_MAX_ATTEMPTS = 5
+# задержка перед повтором удваивается с каждой неудачей
+EMAIL_SPOOL_RETRY_DELAY = 60
+# столько секунд взятое воркером письмо не достанется другому
+EMAIL_SPOOL_LEASE_SEC = 300
 
 CSRF_FAILURE_VIEW = 'core.views.permission_denied_view'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры создаются фоновым пулом при загрузке, а не при первом рендере
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_SIZES = {
+    'feed': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+THUMBNAIL_KVSTORE = 'posts.thumbnails.KVStore'
+# Загруженные картинки перекодируются без EXIF и уменьшаются до
+# IMAGE_MAX_SIZE по большей стороне; рядом пишутся копии ширин
+# IMAGE_VARIANTS для srcset
+IMAGE_MAX_SIZE = 2048
+IMAGE_FORMAT = 'JPEG'
+IMAGE_QUALITY = 85
+IMAGE_VARIANTS = (480, 960, 1440)
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # гистограммы Server-Timing общие для всех процессов,
+    # incr атомарен
+    'timing': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(
+            tempfile.gettempdir(), 'yatube_timing.sqlite3'
+        ),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+# Общий для всех процессов кэш без отдельного сервера (settings_production)
+SHARED_CACHE = {
+    'BACKEND': 'core.cache.SQLiteCache',
+    'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+    'OPTIONS': {
+        'MAX_ENTRIES': 100000,
+        # байт в значениях, сверх этого вытесняются давно не читанные
+        'MAX_SIZE': 256 * 1024 * 1024,
+    },
+}
+# Фрагменты лент версионируются и сбрасываются при изменении постов,
+# поэтому могут жить долго
+CACHE_SEC = 300
+# Защита от лавины пересчетов ({% cache %} из core/templatetags/stampede.py
+# и кэш ответов API): блокировка на время пересчета, сколько ждать чужого
+# пересчета при промахе и сколько отдавать устаревшее значение
+STAMPEDE_LOCK_SEC = 30
+STAMPEDE_WAIT_SEC = 2
+STAMPEDE_STALE_SEC = 60
+# Множитель вероятностного раннего обновления: больше — обновлять раньше
+STAMPEDE_BETA = 1.0
+# Ответы API кэшируются по ETag: ключ меняется вместе с данными
+API_CACHE_SEC = 300
+# HTML отдельного поста: ключ меняется вместе с Post.updated
+POST_FRAGMENT_SEC = 24 * 60 * 60
+# Доля запросов, для которых собираются Server-Timing и гистограммы
+TIMING_SAMPLE_RATE = 0.01
+TIMING_CACHE = 'timing'
+# Token bucket на пишущие view: емкость/период для пользователя и IP.
+# Кэш должен быть общим для всех процессов и уметь атомарный incr
+RATELIMIT_CACHE = 'default'
+RATE_LIMITS = {
+    'post_create': {'user': '10/m', 'ip': '30/m'},
+    'add_comment': {'user': '20/m', 'ip': '60/m'},
+    'profile_follow': {'user': '30/m', 'ip': '90/m'},
 }
-CACHE_SEC = 20
 
 
 SECRET_KEY = 'qo7$yf*_kpou1ooj9lf!jkoc3+l5jmku@@a(xrv!tui4n=bj6&'
@@ -58,11 +147,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.timing.ServerTimingMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'posts.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -104,6 +196,60 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: YATUBE_REPLICAS — пути к файлам SQLite через
+# запятую (для проверки локально подойдет копия db.sqlite3 или он сам)
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.environ.get('YATUBE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{os.path.abspath(path)}?mode=ro',
+        'OPTIONS': {'uri': True},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['posts.replicas.ReplicaRouter']
+# Пишущие view повторяют транзакцию, если SQLite ответил «database is locked»
+DB_WRITE_RETRIES = 3
+DB_WRITE_RETRY_DELAY = 0.05
+# Настройки SQLite для продакшена (см. settings_production): соединения
+# живут между запросами, писатель ждет блокировку до timeout секунд, а
+# PRAGMAS выполняются на каждом новом соединении (core.db)
+SQLITE_PRODUCTION = {
+    'CONN_MAX_AGE': 600,
+    'OPTIONS': {'timeout': 20},
+    'PRAGMAS': {
+        # читатели работают параллельно с писателем
+        'journal_mode': 'WAL',
+        # в WAL fsync только на чекпойнтах; зафиксированные транзакции
+        # переживают падение процесса, но не питания
+        'synchronous': 'NORMAL',
+        # 64 МБ страничного кэша на соединение (отрицательное — в КиБ)
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:api_index',
+    'posts:api_group',
+    'posts:api_profile',
+    'posts:api_post',
+    'posts:api_follow',
+)
+# Наибольшее ожидаемое отставание реплик: ленты с версией моложе этого
+# читаются из основной БД, иначе в кэш под новой версией попали бы старые
+# данные (см. posts.caching.feed_version)
+REPLICA_LAG_SEC = 5
+# Столько секунд после записи клиент читает из основной БД
+REPLICA_STICKY_SEC = REPLICA_LAG_SEC
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -0,0 +1,37 @@
+"""Профиль для продакшена: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+
+SQLite работает в режиме WAL с постоянными соединениями: читатели не ждут
+писателя, а писатели ждут друг друга вместо немедленной ошибки
+«database is locked».
+
+Статика собирается collectstatic с хэшами в именах и gzip-копиями и
+отдается из yatube.wsgi без Django.
+
+Кэш по умолчанию — файл SQLite, общий для всех процессов сервера: фрагменты,
+граф подписок и лимиты запросов не расходятся между воркерами.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import (
+    CACHES, DATABASE_REPLICAS, DATABASES, SHARED_CACHE, SQLITE_PRODUCTION,
+)
+
+DEBUG = False
+
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+
+CACHES['default'] = SHARED_CACHE
+
+DATABASES['default'].update(SQLITE_PRODUCTION)
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias].update({
+        'CONN_MAX_AGE': SQLITE_PRODUCTION['CONN_MAX_AGE'],
+        'OPTIONS': {
+            **DATABASES[alias]['OPTIONS'], **SQLITE_PRODUCTION['OPTIONS']
+        },
+        # режим журнала меняет только основная БД
+        'PRAGMAS': {
+            name: value
+            for name, value in SQLITE_PRODUCTION['PRAGMAS'].items()
+            if name not in ('journal_mode', 'synchronous')
+        },
+    })